@@ -0,0 +1,45 @@
+"""Size budget for main.py, the app's single source file and initial chunk.
+
+Fails when the file grows past its raw or gzip budget, so growth is a deliberate decision:
+raise the budget in the same change that needs the room. The budget is the size when it was
+last set plus about 1%, which leaves room for small fixes but not for a new feature.
+
+This measures the JSX source file, not what browsers download after it is transformed and
+served, so it is a proxy: it catches growth in our own code, not changes in transform output or
+in the size of React and Firebase.
+
+    python bench/check_size.py
+"""
+
+import argparse
+import gzip
+import sys
+from pathlib import Path
+
+SOURCE = Path(__file__).resolve().parent.parent / "main.py"
+# Source bytes, and after gzip as most hosts send it; set from 174,373 and 47,756 bytes plus ~1%
+MAX_BYTES = 176_100
+MAX_GZIP_BYTES = 48_200
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("path", nargs="?", type=Path, default=SOURCE)
+    parser.add_argument("--max-bytes", type=int, default=MAX_BYTES)
+    parser.add_argument("--max-gzip-bytes", type=int, default=MAX_GZIP_BYTES)
+    options = parser.parse_args()
+
+    data = options.path.read_bytes()
+    size = len(data)
+    gzip_size = len(gzip.compress(data, compresslevel=9))
+    print(f"{options.path.name}: {size} bytes (budget {options.max_bytes}), "
+          f"{gzip_size} gzipped (budget {options.max_gzip_bytes})")
+
+    over = size > options.max_bytes or gzip_size > options.max_gzip_bytes
+    if over:
+        print("Size budget exceeded", file=sys.stderr)
+    return 1 if over else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
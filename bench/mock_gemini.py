@@ -0,0 +1,116 @@
+"""Local stand-in for the Gemini endpoint, for benchmark runs of main.py.
+
+Point the app at it with ``__gemini_model_url = 'http://localhost:8787/v1beta/models/mock'``.
+It answers ``:generateContent`` with one JSON reply and ``:streamGenerateContent?alt=sse`` with
+the same reply split over several SSE chunks, after a configurable latency. Benchmark results
+POSTed to ``/results`` (the runner's ``reportUrl``) are written to ``--results``.
+
+    python bench/mock_gemini.py --latency-ms 800 --chunks 8 --chunk-interval-ms 50
+"""
+
+import argparse
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPLY = (
+    "Thank you for sharing that. It sounds like today asked a lot of you. "
+    "Taking a short walk, a few slow breaths, or writing down one thing that went well "
+    "can help you settle. Would you like to talk about what felt hardest?"
+)
+
+
+def reply_chunks(text, count):
+    """Split ``text`` into ``count`` pieces on word boundaries."""
+    words = text.split(" ")
+    size = max(1, -(-len(words) // count))
+    return [" ".join(words[i:i + size]) + (" " if i + size < len(words) else "")
+            for i in range(0, len(words), size)]
+
+
+def candidate(text):
+    return {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}}]}
+
+
+class MockGeminiHandler(BaseHTTPRequestHandler):
+    options = None
+
+    def log_message(self, format, *args):
+        if self.options.verbose:
+            super().log_message(format, *args)
+
+    def send_cors_headers(self):
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Access-Control-Allow-Methods", "POST, OPTIONS")
+        self.send_header("Access-Control-Allow-Headers", "Content-Type")
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_cors_headers()
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_OPTIONS(self):
+        self.send_response(204)
+        self.send_cors_headers()
+        self.end_headers()
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        path = self.path.split("?", 1)[0]
+
+        if path == "/results":
+            with open(self.options.results, "wb") as results:
+                results.write(body)
+            print(f"Benchmark results written to {self.options.results}")
+            return self.send_json(200, {"ok": True})
+
+        if not path.endswith((":generateContent", ":streamGenerateContent")):
+            return self.send_json(404, {"error": {"code": 404, "message": f"Unknown method {path}"}})
+
+        time.sleep(self.options.latency_ms / 1000)
+        if random.random() < self.options.failure_rate:
+            return self.send_json(503, {"error": {"code": 503, "message": "Mock overload", "status": "UNAVAILABLE"}})
+
+        if path.endswith(":generateContent"):
+            return self.send_json(200, candidate(REPLY))
+
+        self.send_response(200)
+        self.send_cors_headers()
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        for i, chunk in enumerate(reply_chunks(REPLY, self.options.chunks)):
+            if i:
+                time.sleep(self.options.chunk_interval_ms / 1000)
+            self.wfile.write(f"data: {json.dumps(candidate(chunk))}\r\n\r\n".encode())
+            self.wfile.flush()
+        self.close_connection = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--latency-ms", type=float, default=500, help="delay before the first byte of a reply")
+    parser.add_argument("--chunks", type=int, default=6, help="SSE chunks per streamed reply")
+    parser.add_argument("--chunk-interval-ms", type=float, default=40, help="delay between SSE chunks")
+    parser.add_argument("--failure-rate", type=float, default=0, help="fraction of requests answered with 503")
+    parser.add_argument("--results", default="benchmark-results.json", help="where POSTed results are written")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    options = parser.parse_args()
+
+    MockGeminiHandler.options = options
+    server = ThreadingHTTPServer(("127.0.0.1", options.port), MockGeminiHandler)
+    print(f"Mock Gemini listening on http://127.0.0.1:{options.port}/v1beta/models/mock")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,238 +1,3820 @@
-import React, { useState, useEffect, useRef } from 'react';
+import React, { useState, useEffect, useRef, useMemo, useCallback, useLayoutEffect, useSyncExternalStore } from 'react';
 import { initializeApp } from 'firebase/app';
-import { getAuth, signInAnonymously, signInWithCustomToken, onAuthStateChanged } from 'firebase/auth';
-import { getFirestore, doc, getDoc, addDoc, setDoc, updateDoc, deleteDoc, onSnapshot, collection, query, where, orderBy, serverTimestamp } from 'firebase/firestore';
+import { getFirestore, initializeFirestore, persistentLocalCache, persistentMultipleTabManager, connectFirestoreEmulator, doc, getDoc, addDoc as firestoreAddDoc, setDoc as firestoreSetDoc, updateDoc, deleteDoc as firestoreDeleteDoc, onSnapshot, collection, query as firestoreQuery, where, orderBy, limit, startAt, startAfter, endAt, getDocs as firestoreGetDocs, writeBatch as firestoreWriteBatch, runTransaction as firestoreRunTransaction, serverTimestamp, increment, arrayUnion, arrayRemove, Timestamp, documentId } from 'firebase/firestore';
 
-// Main App component
-const App = () => {
-    const [activeTab, setActiveTab] = useState('mood'); // 'mood', 'journal', 'chat'
+// Number of documents fetched per page for each history list
+const PAGE_SIZE = 25;
+// Distance (px) from a list edge at which the next page is requested
+const LOAD_MORE_THRESHOLD = 200;
+// Characters of recent chat sent verbatim to the model (roughly 4 characters per token)
+const CHAT_CONTEXT_CHAR_BUDGET = 6000;
+// Older turns are folded into the rolling summary once at least this many characters overflow the budget
+const CHAT_SUMMARY_FOLD_CHARS = 2000;
+// Upper bound on the stored rolling summary
+const CHAT_SUMMARY_MAX_CHARS = 1500;
+
+// Prefix for the small warm-start snapshot kept in localStorage
+const LOCAL_STORAGE_PREFIX = 'wellbeing-hub:';
+
+// Firestore with a persistent IndexedDB cache shared by all open tabs, so history is available
+// offline and writes made offline are queued durably. Falls back to the default in-memory cache
+// where IndexedDB is unavailable. __firestore_emulator_host ("host:port") targets the emulator.
+const createFirestore = (app) => {
+    let db;
+    try {
+        db = initializeFirestore(app, {
+            localCache: persistentLocalCache({ tabManager: persistentMultipleTabManager() })
+        });
+    } catch (error) {
+        console.error("Error enabling persistent Firestore cache:", error);
+        db = getFirestore(app);
+    }
+    if (typeof __firestore_emulator_host !== 'undefined') {
+        const [host, port] = __firestore_emulator_host.split(':');
+        connectFirestoreEmulator(db, host, Number(port));
+    }
+    return db;
+};
+
+// localStorage helpers; storage may be full or unavailable, in which case warm start is skipped
+const readLocal = (key) => {
+    try {
+        const raw = localStorage.getItem(LOCAL_STORAGE_PREFIX + key);
+        return raw ? JSON.parse(raw) : null;
+    } catch (error) {
+        return null;
+    }
+};
+
+const writeLocal = (key, value) => {
+    try {
+        localStorage.setItem(LOCAL_STORAGE_PREFIX + key, JSON.stringify(value));
+    } catch (error) {
+        console.error("Error writing local cache:", error);
+    }
+};
+
+// Minimal external store. Components read it through useStore with a selector and re-render only
+// when the selected value changes, so e.g. a streaming chat reply does not re-render the tabs.
+const createStore = (initialState) => {
+    let state = initialState;
+    const listeners = new Set();
+    return {
+        getState: () => state,
+        setState: (partial) => {
+            const changes = typeof partial === 'function' ? partial(state) : partial;
+            if (Object.keys(changes).every(key => Object.is(state[key], changes[key]))) return;
+            state = { ...state, ...changes };
+            listeners.forEach(listener => listener());
+        },
+        subscribe: (listener) => {
+            listeners.add(listener);
+            return () => listeners.delete(listener);
+        },
+    };
+};
+
+const useStore = (store, selector) => useSyncExternalStore(store.subscribe, () => selector(store.getState()));
+
+// Session and UI state shared across the feature components
+const appStore = createStore({
+    activeTab: 'mood', // 'mood', 'journal', 'chat'
+    db: null,
+    auth: null,
+    // With a remembered user the cached history is shown right away instead of waiting for auth
+    userId: readLocal('lastUserId'),
+    loadingData: !readLocal('lastUserId'),
+    online: typeof navigator === 'undefined' || navigator.onLine,
+    loadingChat: false,
+    streamingText: '',
+    pendingChat: [],
+    pendingSummary: null,
+    summarizing: false,
+    // Answer repeated questions from the AI response cache
+    reuseAiAnswers: readLocal('reuseAiAnswers') !== false,
+    // Running or last finished export/import: { kind, label, fraction, running, error }
+    transfer: null,
+    unsyncedMoods: new Set(),
+});
+
+const userPathFor = (userId) => (userId ? `artifacts/${__app_id}/users/${userId}` : null);
+
+// Performance instrumentation. A session is instrumented in benchmark mode (__benchmark, see
+// runBenchmark), when the developer overlay is shown (?perf in the URL or __perf.overlay), or when
+// picked at random with probability __perf.sampleRate. Instrumented sessions record timings as
+// performance marks and measures, document reads and writes per collection and React render stats;
+// if __perf.reportUrl is set the session report is sent there whenever the page is hidden.
+// In all other sessions `perf` is null and nothing is recorded.
+const BENCHMARK_CONFIG = typeof __benchmark !== 'undefined' ? __benchmark : null;
+const PERF_CONFIG = typeof __perf !== 'undefined' ? __perf : {};
+const PERF_OVERLAY = Boolean(PERF_CONFIG.overlay) || (typeof location !== 'undefined' && new URLSearchParams(location.search).has('perf'));
+// Module evaluation time, the baseline for time-to-first-render
+const APP_STARTED_AT = typeof performance !== 'undefined' ? performance.now() : 0;
+// Prefix of every mark and measure this app adds to the performance timeline
+const PERF_PREFIX = 'wellbeing:';
+// Measures kept in the timeline per name; older ones are cleared (their totals are kept)
+const PERF_TIMELINE_LIMIT = 200;
+
+// Path relative to the user's data, e.g. 'journalEntries' or 'settings/chat'
+const perfName = (path) => path.replace(/^artifacts\/[^/]+\/users\/[^/]+\//, '');
+
+const createPerfRecorder = () => {
+    const metrics = {
+        firstRenderMs: null,
+        firstSnapshotMs: null,
+        // Commits per profiled component, and render time per profiled subtree (profiling builds only)
+        commits: {},
+        renders: {},
+        snapshots: {},
+        // Estimated billable document operations per collection: { listen, get, set, add, update, delete }
+        firestore: {},
+        spans: {},
+        chatTurns: [],
+    };
+    const timelineCounts = {};
+    // Counters kept by other modules (e.g. the AI response cache), read when reporting
+    const statsSources = new Map();
+    const addStats = (name, getStats) => statsSources.set(name, getStats);
+    const readStats = () => Object.fromEntries([...statsSources].map(([name, getStats]) => [name, getStats()]));
+
+    const measure = (name, start, end) => {
+        const measureName = PERF_PREFIX + name;
+        performance.measure(measureName, { start, end });
+        timelineCounts[name] = (timelineCounts[name] || 0) + 1;
+        if (timelineCounts[name] > PERF_TIMELINE_LIMIT) {
+            performance.clearMeasures(measureName);
+            timelineCounts[name] = 0;
+        }
+    };
+
+    const aggregate = (group, name, durationMs) => {
+        const stats = group[name] || (group[name] = { count: 0, totalMs: 0, maxMs: 0 });
+        stats.count++;
+        stats.totalMs += durationMs;
+        stats.maxMs = Math.max(stats.maxMs, durationMs);
+        return stats;
+    };
+
+    // Start timing `name`; the returned function ends the span (only its first call counts) and
+    // marks it failed when given an error
+    const span = (name) => {
+        const start = performance.now();
+        let ended = false;
+        return (error) => {
+            if (ended) return;
+            ended = true;
+            const end = performance.now();
+            measure(name, start, end);
+            const stats = aggregate(metrics.spans, name, end - start);
+            if (error) stats.failures = (stats.failures || 0) + 1;
+        };
+    };
+
+    // Called from a layout effect on each commit of a profiled component, in any React build.
+    // The first call marks the first render.
+    const recordCommit = (id) => {
+        if (metrics.firstRenderMs === null) {
+            const now = performance.now();
+            metrics.firstRenderMs = now - APP_STARTED_AT;
+            performance.mark(`${PERF_PREFIX}first-render`, { startTime: now });
+        }
+        metrics.commits[id] = (metrics.commits[id] || 0) + 1;
+    };
+
+    // React.Profiler onRender callback: render time per profiled subtree. React only calls it in
+    // development and profiling builds, so production sessions report commits without durations.
+    const recordRender = (id, phase, actualDuration) => {
+        aggregate(metrics.renders, id, actualDuration);
+    };
+
+    const countDocuments = (path, operation, count) => {
+        const name = perfName(path);
+        const counts = metrics.firestore[name] || (metrics.firestore[name] = {});
+        counts[operation] = (counts[operation] || 0) + count;
+    };
+
+    // Start tracking one attached listener on `path`. The returned function records a snapshot
+    // callback pass started at `start`. The first snapshot from the server bills the whole result
+    // (`resultSize` documents, at least one), even when the cache already delivered it and it
+    // carries no changes; later ones bill their changes. Snapshots served from the cache or raised
+    // by local writes add no reads.
+    const trackListener = (path) => {
+        const name = perfName(path);
+        let syncedWithServer = false;
+        return (start, snapshot, changeCount, resultSize) => {
+            const end = performance.now();
+            if (metrics.firstSnapshotMs === null) metrics.firstSnapshotMs = end - APP_STARTED_AT;
+            if (!metrics.snapshots[name]) performance.mark(`${PERF_PREFIX}first-snapshot:${name}`, { startTime: end });
+            measure(`snapshot:${name}`, start, end);
+            const stats = aggregate(metrics.snapshots, name, end - start);
+            stats.changes = (stats.changes || 0) + changeCount;
+            const { fromCache, hasPendingWrites } = snapshot.metadata;
+            if (fromCache) return;
+            if (!syncedWithServer) {
+                syncedWithServer = true;
+                countDocuments(path, 'listen', Math.max(1, resultSize));
+            } else if (!hasPendingWrites) {
+                countDocuments(path, 'listen', changeCount);
+            }
+        };
+    };
+
+    const recordChatTurn = (turn) => metrics.chatTurns.push(turn);
+
+    const sessionId = Math.random().toString(36).slice(2);
+    const startedAt = new Date().toISOString();
+    const report = () => ({
+        sessionId,
+        startedAt,
+        reportedAt: new Date().toISOString(),
+        userAgent: navigator.userAgent,
+        metrics,
+        stats: readStats(),
+        measures: performance.getEntriesByType('measure')
+            .filter(entry => entry.name.startsWith(PERF_PREFIX))
+            .map(({ name, startTime, duration }) => ({ name: name.slice(PERF_PREFIX.length), startTime, duration })),
+    });
+
+    return { metrics, span, recordCommit, recordRender, trackListener, countDocuments, recordChatTurn, addStats, readStats, report };
+};
+
+const perf = BENCHMARK_CONFIG || PERF_OVERLAY || Math.random() < (PERF_CONFIG.sampleRate || 0) ? createPerfRecorder() : null;
+
+if (perf && PERF_CONFIG.reportUrl) {
+    document.addEventListener('visibilitychange', () => {
+        if (document.visibilityState === 'hidden') navigator.sendBeacon(PERF_CONFIG.reportUrl, JSON.stringify(perf.report()));
+    });
+}
+
+// Firestore calls that count document operations per collection in instrumented sessions.
+// Queries remember the collection they were built from so their reads can be attributed.
+const queryPaths = new WeakMap();
+const sourcePath = (source) => source.path || queryPaths.get(source) || 'unknown';
+
+const query = (source, ...constraints) => {
+    const built = firestoreQuery(source, ...constraints);
+    if (perf) queryPaths.set(built, sourcePath(source));
+    return built;
+};
+
+// A query is billed at least one read, even when it matches nothing
+const getDocs = async (source) => {
+    const snapshot = await firestoreGetDocs(source);
+    if (perf && !snapshot.metadata.fromCache) perf.countDocuments(sourcePath(source), 'get', Math.max(1, snapshot.size));
+    return snapshot;
+};
+
+const setDoc = (ref, ...args) => {
+    if (perf) perf.countDocuments(ref.parent.path, 'set', 1);
+    return firestoreSetDoc(ref, ...args);
+};
+
+const addDoc = (ref, data) => {
+    if (perf) perf.countDocuments(ref.path, 'add', 1);
+    return firestoreAddDoc(ref, data);
+};
+
+const deleteDoc = (ref) => {
+    if (perf) perf.countDocuments(ref.parent.path, 'delete', 1);
+    return firestoreDeleteDoc(ref);
+};
+
+// Transactions count their reads as they happen and their writes per attempt
+const runTransaction = (db, update) => firestoreRunTransaction(db, (transaction) => {
+    if (!perf) return update(transaction);
+    const counted = {
+        get: async (ref) => {
+            const snapshot = await transaction.get(ref);
+            perf.countDocuments(ref.parent.path, 'get', 1);
+            return snapshot;
+        },
+    };
+    ['set', 'update', 'delete'].forEach(operation => {
+        counted[operation] = (ref, ...args) => {
+            transaction[operation](ref, ...args);
+            perf.countDocuments(ref.parent.path, operation, 1);
+            return counted;
+        };
+    });
+    return update(counted);
+});
+
+// Batches count their writes when committed
+const writeBatch = (db) => {
+    const batch = firestoreWriteBatch(db);
+    if (!perf) return batch;
+    const writes = [];
+    const counted = {
+        commit: () => {
+            writes.forEach(([ref, operation]) => perf.countDocuments(ref.parent.path, operation, 1));
+            return batch.commit();
+        },
+    };
+    ['set', 'update', 'delete'].forEach(operation => {
+        counted[operation] = (ref, ...args) => {
+            batch[operation](ref, ...args);
+            writes.push([ref, operation]);
+            return counted;
+        };
+    });
+    return counted;
+};
+
+// One shared formatter; building a new one per call (as toLocaleString does) dominates list rendering
+const timestampFormat = new Intl.DateTimeFormat(undefined, {
+    year: 'numeric', month: 'numeric', day: 'numeric', hour: 'numeric', minute: '2-digit', second: '2-digit'
+});
+
+// Format timestamp for display
+const formatTimestamp = (timestamp) => {
+    if (!timestamp) return 'N/A';
+    const date = timestamp.toDate ? timestamp.toDate() : new Date(timestamp);
+    return timestampFormat.format(date);
+};
+
+// Map a Firestore document to a plain entry. Pending server timestamps resolve to a local estimate
+// so freshly written entries sort and display correctly before the server acknowledges them.
+const toEntry = (docSnap) => ({ id: docSnap.id, ...docSnap.data({ serverTimestamps: 'estimate' }) });
+
+// Like toEntry, but flags entries whose local writes the server has not acknowledged yet
+const toPendingAwareEntry = (docSnap) => ({ ...toEntry(docSnap), pending: docSnap.metadata.hasPendingWrites });
+
+const entryKey = (entry) => entry.id;
+
+const timestampMillis = (timestamp) => {
+    if (!timestamp) return Number.MAX_SAFE_INTEGER;
+    return timestamp.toMillis ? timestamp.toMillis() : new Date(timestamp).getTime();
+};
+
+const compareIds = (a, b) => (a.id < b.id ? -1 : a.id > b.id ? 1 : 0);
+
+// Entry orderings; ties are broken by id so every entry has exactly one position
+const newestFirst = (a, b) => (timestampMillis(b.timestamp) - timestampMillis(a.timestamp)) || compareIds(a, b);
+const oldestFirst = (a, b) => (timestampMillis(a.timestamp) - timestampMillis(b.timestamp)) || compareIds(a, b);
+
+// Timestamps, nested ones included, become {"__timestamp": [seconds, nanoseconds]} before
+// stringifying, since their own toJSON loses the type
+const encodeTimestamps = (value) => {
+    if (value instanceof Timestamp) return { __timestamp: [value.seconds, value.nanoseconds] };
+    if (Array.isArray(value)) return value.map(encodeTimestamps);
+    if (value && typeof value === 'object') {
+        return Object.fromEntries(Object.entries(value).map(([key, field]) => [key, encodeTimestamps(field)]));
+    }
+    return value;
+};
+
+// JSON.parse reviver undoing encodeTimestamps
+const reviveTimestamps = (key, value) => (
+    value && Array.isArray(value.__timestamp) ? new Timestamp(value.__timestamp[0], value.__timestamp[1]) : value
+);
+
+const decodeTimestamps = (value) => {
+    if (Array.isArray(value)) return value.map(decodeTimestamps);
+    if (value && typeof value === 'object' && !(value instanceof Timestamp)) {
+        return reviveTimestamps(null, Object.fromEntries(Object.entries(value).map(([key, field]) => [key, decodeTimestamps(field)])));
+    }
+    return value;
+};
+
+// Warm-start snapshots; earlier versions stored top-level timestamps as milliseconds
+const serializeEntry = ({ pending, ...entry }) => encodeTimestamps(entry);
+const deserializeEntry = (entry) => {
+    const decoded = decodeTimestamps(entry);
+    return typeof decoded.timestamp === 'number' ? { ...decoded, timestamp: Timestamp.fromMillis(decoded.timestamp) } : decoded;
+};
+
+const sameValue = (a, b) => a === b || (a != null && typeof a.isEqual === 'function' && a.isEqual(b));
+
+const sameEntry = (a, b) => {
+    const keys = Object.keys(a);
+    return keys.length === Object.keys(b).length && keys.every(key => sameValue(a[key], b[key]));
+};
+
+// Keyed, ordered entry store. Snapshot changes are applied by binary search into the sorted list
+// instead of rebuilding and re-sorting it, and entries whose data did not change keep their object
+// identity so memoized rows can skip re-rendering. Each batch yields at most one new list, and the
+// previous list is returned untouched when nothing changed so React can bail out of the update.
+const createEntryStore = (compare, mapDoc = toEntry) => {
+    let list = [];
+    const byId = new Map();
+
+    // Index of the first entry that does not sort before `entry`
+    const lowerBound = (items, entry) => {
+        let low = 0;
+        let high = items.length;
+        while (low < high) {
+            const mid = (low + high) >> 1;
+            if (compare(items[mid], entry) < 0) {
+                low = mid + 1;
+            } else {
+                high = mid;
+            }
+        }
+        return low;
+    };
+
+    const batch = (apply) => {
+        let next = null;
+        const writable = () => next || (next = list.slice());
+
+        const remove = (id) => {
+            const existing = byId.get(id);
+            if (!existing) return;
+            const items = writable();
+            const index = lowerBound(items, existing);
+            if (items[index] === existing) items.splice(index, 1);
+            byId.delete(id);
+        };
+
+        const upsert = (entry) => {
+            const existing = byId.get(entry.id);
+            if (existing && sameEntry(existing, entry)) return;
+            if (existing) remove(entry.id);
+            const items = writable();
+            items.splice(lowerBound(items, entry), 0, entry);
+            byId.set(entry.id, entry);
+        };
+
+        apply({ upsert, remove });
+        if (next) list = next;
+        return list;
+    };
+
+    return {
+        applyChanges: (changes) => batch(({ upsert, remove }) => {
+            changes.forEach(change => {
+                if (change.type === 'removed') {
+                    remove(change.doc.id);
+                } else {
+                    upsert(mapDoc(change.doc));
+                }
+            });
+        }),
+        upsertMany: (entries) => batch(({ upsert }) => entries.forEach(upsert)),
+        remove: (id) => batch(({ remove }) => remove(id)),
+        removeMany: (ids) => batch(({ remove }) => ids.forEach(remove)),
+        has: (id) => byId.has(id),
+        get: (id) => byId.get(id),
+        clear: () => {
+            list = [];
+            byId.clear();
+            return list;
+        },
+    };
+};
+
+// Milliseconds a listener stays attached after the last view using it unmounts, so quick tab
+// switches reuse the live listener instead of re-reading the collection
+const LISTENER_IDLE_MS = 30000;
+
+// Reference-counted listeners. retain() attaches on the first user and returns a release function;
+// the listener is detached once it has had no users for LISTENER_IDLE_MS.
+const createListenerManager = (idleMs) => {
+    const listeners = new Map();
+
+    const retain = (key, attach) => {
+        let listener = listeners.get(key);
+        if (listener) {
+            clearTimeout(listener.idleTimer);
+            listener.refs++;
+        } else {
+            listener = { refs: 1, detach: attach(), idleTimer: null };
+            listeners.set(key, listener);
+        }
+
+        let released = false;
+        return () => {
+            if (released) return;
+            released = true;
+            listener.refs--;
+            if (listener.refs > 0) return;
+            listener.idleTimer = setTimeout(() => {
+                listener.detach();
+                listeners.delete(key);
+            }, idleMs);
+        };
+    };
+
+    return { retain };
+};
+
+const listenerManager = createListenerManager(LISTENER_IDLE_MS);
+
+// A collection ordered by timestamp (newest first), read one page at a time.
+// The newest page is kept live through onSnapshot; older pages are fetched on demand with
+// startAfter cursors. Once paging starts the live query is pinned to the first page boundary
+// with endAt, so entries never fall out of the live window into a gap between pages.
+// Live and older pages feed one entry store, exposed in `compare` order. With trackPendingWrites
+// entries carry a `pending` flag that clears once the server acknowledges the write.
+// State lives outside React and outlives the listener, so a view that mounts again shows the last
+// result immediately. The newest page is also mirrored to localStorage and seeds the store on the
+// next start. After seeding or re-attaching, the first live snapshot drops entries of the previous
+// live window that no longer exist. observeChanges lets derived state such as the journal search
+// index follow the collection: `attached(db)` runs on every attach, `changed(docChanges)` with
+// every live snapshot, `dropped(ids)` for entries pruned from the previous live window (deleted,
+// or pushed out of it) and `removed(ids)` for entries deleted through this collection.
+const createPagedCollection = (path, { compare = newestFirst, pageSize = PAGE_SIZE, trackPendingWrites = false } = {}) => {
+    const store = createEntryStore(compare, trackPendingWrites ? toPendingAwareEntry : toEntry);
+    const subscribers = new Set();
+    const changeObservers = new Set();
+    let db = null;
+    let unsubscribe = null;
+    let anchor = null;
+    let lastLiveDoc = null;
+    let cursor = null;
+    let loading = false;
+    let liveIds = [];
+    let needsPrune = false;
+    let persistTimer = null;
+    let state;
+
+    const setState = (changes) => {
+        state = { ...state, ...changes };
+        subscribers.forEach(subscriber => subscriber());
+    };
+
+    // Mirror the newest page for the next warm start (coalesced, since snapshots can arrive in bursts)
+    const persist = () => {
+        clearTimeout(persistTimer);
+        persistTimer = setTimeout(() => {
+            const { entries } = state;
+            const newestPageFirst = entries.length < 2 || newestFirst(entries[0], entries[entries.length - 1]) <= 0;
+            const page = newestPageFirst ? entries.slice(0, pageSize) : entries.slice(-pageSize);
+            writeLocal(path, page.map(serializeEntry));
+        }, 500);
+    };
+
+    const listen = () => {
+        const liveQuery = anchor
+            ? query(collection(db, path), orderBy('timestamp', 'desc'), endAt(anchor))
+            : query(collection(db, path), orderBy('timestamp', 'desc'), limit(pageSize));
+        const listenOptions = { includeMetadataChanges: trackPendingWrites };
+        const recordSnapshot = perf && perf.trackListener(path);
+        unsubscribe = onSnapshot(liveQuery, listenOptions, (snapshot) => {
+            const snapshotStarted = perf && performance.now();
+            const docChanges = snapshot.docChanges(listenOptions);
+            let entries = store.applyChanges(docChanges);
+            changeObservers.forEach(observer => observer.changed(docChanges));
+            const ids = snapshot.docs.map(docSnap => docSnap.id);
+            if (needsPrune) {
+                const live = new Set(ids);
+                const pruned = liveIds.filter(id => !live.has(id));
+                entries = store.removeMany(pruned);
+                if (pruned.length) changeObservers.forEach(observer => observer.dropped(pruned));
+                needsPrune = false;
+            }
+            liveIds = ids;
+
+            const changes = { entries };
+            if (!anchor) {
+                lastLiveDoc = snapshot.docs[snapshot.docs.length - 1] || null;
+                changes.hasMore = snapshot.size >= pageSize;
+            }
+            setState(changes);
+            persist();
+            if (recordSnapshot) recordSnapshot(snapshotStarted, snapshot, docChanges.length, snapshot.size);
+        }, (error) => {
+            console.error(`Error fetching ${path}:`, error);
+        });
+    };
+
+    const attach = (firestore) => {
+        db = firestore;
+        needsPrune = true;
+        listen();
+        changeObservers.forEach(observer => observer.attached(firestore));
+        return () => {
+            unsubscribe();
+            unsubscribe = null;
+        };
+    };
+
+    const loadMore = async () => {
+        const start = cursor || lastLiveDoc;
+        if (!db || !state.hasMore || !start || loading) return;
+
+        loading = true;
+        setState({ loadingMore: true });
+        try {
+            const snapshot = await getDocs(query(collection(db, path), orderBy('timestamp', 'desc'), startAfter(start), limit(pageSize)));
+            if (!cursor) {
+                // First older page: freeze the live window at its current boundary
+                anchor = start;
+                if (unsubscribe) {
+                    unsubscribe();
+                    listen();
+                }
+            }
+            cursor = snapshot.docs[snapshot.docs.length - 1] || start;
+            setState({ entries: store.upsertMany(snapshot.docs.map(toEntry)), hasMore: snapshot.size >= pageSize });
+        } catch (error) {
+            console.error(`Error loading more from ${path}:`, error);
+        } finally {
+            loading = false;
+            setState({ loadingMore: false });
+        }
+    };
+
+    // Older pages are fetched once, so deletions have to be applied to them locally
+    const removeEntries = (ids) => {
+        setState({ entries: store.removeMany(ids) });
+        changeObservers.forEach(observer => observer.removed(ids));
+    };
+    const removeEntry = (id) => removeEntries([id]);
+    const replaceEntry = (entry) => setState({ entries: store.upsertMany([entry]) });
+
+    const hasEntry = (id) => store.has(id);
+
+    const cached = readLocal(path) || [];
+    liveIds = cached.map(entry => entry.id);
+    state = {
+        entries: store.upsertMany(cached.map(deserializeEntry)),
+        hasMore: false,
+        loadingMore: false,
+        loadMore,
+        removeEntry,
+        removeEntries,
+        replaceEntry,
+        hasEntry,
+    };
+
+    return {
+        path,
+        attach,
+        getState: () => state,
+        subscribe: (subscriber) => {
+            subscribers.add(subscriber);
+            return () => subscribers.delete(subscriber);
+        },
+        observeChanges: (observer) => {
+            changeObservers.add(observer);
+            if (unsubscribe) observer.attached(db);
+            return () => changeObservers.delete(observer);
+        },
+    };
+};
+
+// Paged collections by path; kept for the session so their last result is reused
+const pagedCollections = new Map();
+
+const getPagedCollection = (path, options) => {
+    if (!pagedCollections.has(path)) pagedCollections.set(path, createPagedCollection(path, options));
+    return pagedCollections.get(path);
+};
+
+const EMPTY_COLLECTION_STATE = {
+    entries: [],
+    hasMore: false,
+    loadingMore: false,
+    loadMore: () => {},
+    removeEntry: () => {},
+    removeEntries: () => {},
+    replaceEntry: () => {},
+    hasEntry: () => false,
+};
+const subscribeNothing = () => () => {};
+const getEmptyCollectionState = () => EMPTY_COLLECTION_STATE;
+
+// Read a paged collection from a view. The collection's listener is retained while the view is
+// mounted (path null: nothing is read); its cached entries are available immediately.
+const usePagedCollection = (db, path, options) => {
+    const pagedCollection = path ? getPagedCollection(path, options) : null;
+
+    useEffect(() => {
+        if (!pagedCollection || !db) return;
+        return listenerManager.retain(`collection:${path}`, () => pagedCollection.attach(db));
+    }, [pagedCollection, db, path]);
+
+    return useSyncExternalStore(
+        pagedCollection ? pagedCollection.subscribe : subscribeNothing,
+        pagedCollection ? pagedCollection.getState : getEmptyCollectionState
+    );
+};
+
+// A single live document, shared and retained the same way as paged collections.
+// Its data is undefined until the first snapshot and null if the document does not exist.
+const createLiveDocument = (path) => {
+    const subscribers = new Set();
+    let data;
+
+    const attach = (db) => {
+        const recordSnapshot = perf && perf.trackListener(path);
+        return onSnapshot(doc(db, path), (snapshot) => {
+            const snapshotStarted = perf && performance.now();
+            data = snapshot.exists() ? snapshot.data() : null;
+            subscribers.forEach(subscriber => subscriber());
+            if (recordSnapshot) recordSnapshot(snapshotStarted, snapshot, 1, 1);
+        }, (error) => {
+            console.error(`Error fetching ${path}:`, error);
+        });
+    };
+
+    return {
+        attach,
+        getData: () => data,
+        subscribe: (subscriber) => {
+            subscribers.add(subscriber);
+            return () => subscribers.delete(subscriber);
+        },
+    };
+};
+
+const liveDocuments = new Map();
+
+const getLiveDocument = (path) => {
+    if (!liveDocuments.has(path)) liveDocuments.set(path, createLiveDocument(path));
+    return liveDocuments.get(path);
+};
+
+const getNothing = () => null;
+
+const useLiveDocument = (db, path) => {
+    const liveDocument = path ? getLiveDocument(path) : null;
+
+    useEffect(() => {
+        if (!liveDocument || !db) return;
+        return listenerManager.retain(`document:${path}`, () => liveDocument.attach(db));
+    }, [liveDocument, db, path]);
+
+    return useSyncExternalStore(
+        liveDocument ? liveDocument.subscribe : subscribeNothing,
+        liveDocument ? liveDocument.getData : getNothing
+    );
+};
+
+// Index of the row containing vertical offset y (offsets holds the running row tops)
+const findRowAt = (offsets, y) => {
+    let low = 0;
+    let high = offsets.length - 2;
+    while (low < high) {
+        const mid = (low + high) >> 1;
+        if (offsets[mid + 1] > y) {
+            high = mid;
+        } else {
+            low = mid + 1;
+        }
+    }
+    return Math.max(low, 0);
+};
+
+// Inline SVG icons for the handful of glyphs the app uses, instead of the full Font Awesome stylesheet
+const ICON_PATHS = {
+    smile: (
+        <g>
+            <circle cx="12" cy="12" r="10" />
+            <path d="M8 14s1.5 2 4 2 4-2 4-2" />
+            <line x1="9" y1="9" x2="9.01" y2="9" />
+            <line x1="15" y1="9" x2="15.01" y2="9" />
+        </g>
+    ),
+    'book-open': (
+        <g>
+            <path d="M2 3h6a4 4 0 0 1 4 4v14a3 3 0 0 0-3-3H2z" />
+            <path d="M22 3h-6a4 4 0 0 0-4 4v14a3 3 0 0 1 3-3h7z" />
+        </g>
+    ),
+    robot: (
+        <g>
+            <rect x="3" y="8" width="18" height="12" rx="2" />
+            <path d="M12 8V4" />
+            <circle cx="12" cy="3" r="1" />
+            <circle cx="8.5" cy="14" r="1.5" />
+            <circle cx="15.5" cy="14" r="1.5" />
+        </g>
+    ),
+    trash: (
+        <g>
+            <polyline points="3 6 5 6 21 6" />
+            <path d="M19 6l-1 14a2 2 0 0 1-2 2H8a2 2 0 0 1-2-2L5 6" />
+            <path d="M10 11v6" />
+            <path d="M14 11v6" />
+            <path d="M9 6V4a1 1 0 0 1 1-1h4a1 1 0 0 1 1 1v2" />
+        </g>
+    ),
+    'paper-plane': (
+        <g>
+            <line x1="22" y1="2" x2="11" y2="13" />
+            <polygon points="22 2 15 22 11 13 2 9 22 2" />
+        </g>
+    ),
+};
+
+const Icon = ({ name, className = '' }) => (
+    <svg
+        viewBox="0 0 24 24"
+        width="1em"
+        height="1em"
+        fill="none"
+        stroke="currentColor"
+        strokeWidth="2"
+        strokeLinecap="round"
+        strokeLinejoin="round"
+        aria-hidden="true"
+        className={`inline-block align-[-0.125em] ${className}`}
+    >
+        {ICON_PATHS[name]}
+    </svg>
+);
+
+// Windowed list: only rows intersecting the viewport (plus overscan) are mounted.
+// Row heights are measured after render and cached by key, so variable-height rows are supported.
+// With stickToBottom the list follows new rows at the bottom and keeps its position when older
+// rows are prepended (chat); otherwise new rows may appear at the top (history lists).
+const VirtualList = React.memo(({
+    items,
+    getKey,
+    renderItem,
+    className = '',
+    rowClassName = '',
+    estimatedRowHeight = 72,
+    overscan = 5,
+    stickToBottom = false,
+    onStartReached,
+    onEndReached,
+    footer = null,
+}) => {
+    const containerRef = useRef(null);
+    const contentRef = useRef(null);
+    const rowRefs = useRef(new Map());
+    const heightsRef = useRef(new Map());
+    const atBottomRef = useRef(true);
+    const firstKeyRef = useRef(null);
+    const [scrollTop, setScrollTop] = useState(0);
+    const [viewportHeight, setViewportHeight] = useState(0);
+    const [measureVersion, setMeasureVersion] = useState(0);
+
+    const offsets = useMemo(() => {
+        const result = new Array(items.length + 1);
+        result[0] = 0;
+        for (let i = 0; i < items.length; i++) {
+            result[i + 1] = result[i] + (heightsRef.current.get(getKey(items[i])) ?? estimatedRowHeight);
+        }
+        return result;
+    }, [items, getKey, estimatedRowHeight, measureVersion]);
+    const totalHeight = offsets[items.length];
+
+    const start = Math.max(0, findRowAt(offsets, scrollTop) - overscan);
+    const end = Math.min(items.length, findRowAt(offsets, scrollTop + viewportHeight) + 1 + overscan);
+
+    const checkEdges = (el) => {
+        const distanceToBottom = el.scrollHeight - el.scrollTop - el.clientHeight;
+        if (onEndReached && distanceToBottom < LOAD_MORE_THRESHOLD) onEndReached();
+        if (onStartReached && el.scrollTop < LOAD_MORE_THRESHOLD) onStartReached();
+    };
+
+    const handleScroll = () => {
+        const el = containerRef.current;
+        if (!el) return;
+        atBottomRef.current = el.scrollHeight - el.scrollTop - el.clientHeight < 40;
+        setScrollTop(el.scrollTop);
+        checkEdges(el);
+    };
+
+    // Track the viewport size
+    useLayoutEffect(() => {
+        const el = containerRef.current;
+        if (!el) return;
+        setViewportHeight(el.clientHeight);
+        if (typeof ResizeObserver === 'undefined') return;
+        const observer = new ResizeObserver(() => setViewportHeight(el.clientHeight));
+        observer.observe(el);
+        return () => observer.disconnect();
+    }, []);
+
+    // Measure mounted rows after every render; re-layout only when a height actually changed
+    useLayoutEffect(() => {
+        let changed = false;
+        rowRefs.current.forEach((el, key) => {
+            const height = el.offsetHeight;
+            if (heightsRef.current.get(key) !== height) {
+                heightsRef.current.set(key, height);
+                changed = true;
+            }
+        });
+        if (changed) setMeasureVersion(v => v + 1);
+    });
+
+    // Keep the scroll position stable as rows are added, then request more rows if needed
+    useLayoutEffect(() => {
+        const el = containerRef.current;
+        if (!el) return;
+        const firstKey = items.length ? getKey(items[0]) : null;
+        const previousFirstKey = firstKeyRef.current;
+        firstKeyRef.current = firstKey;
+
+        if (stickToBottom && atBottomRef.current) {
+            el.scrollTop = el.scrollHeight;
+        } else if (stickToBottom && previousFirstKey !== null && firstKey !== previousFirstKey) {
+            // Older rows were prepended: keep the previously first row where it was
+            const index = items.findIndex(item => getKey(item) === previousFirstKey);
+            if (index > 0) el.scrollTop += offsets[index];
+        }
+        setScrollTop(el.scrollTop);
+        checkEdges(el);
+    }, [items, totalHeight]);
+
+    // Follow content that grows below the rows without re-rendering the list
+    // (e.g. a streaming reply in a footer that subscribes to its own state)
+    useLayoutEffect(() => {
+        const el = containerRef.current;
+        const content = contentRef.current;
+        if (!stickToBottom || !el || !content || typeof ResizeObserver === 'undefined') return;
+        const observer = new ResizeObserver(() => {
+            if (atBottomRef.current) el.scrollTop = el.scrollHeight;
+        });
+        observer.observe(content);
+        return () => observer.disconnect();
+    }, [stickToBottom]);
+
+    return (
+        <div ref={containerRef} onScroll={handleScroll} className={className}>
+            <div ref={contentRef}>
+                <div role="list" style={{ paddingTop: offsets[start], paddingBottom: totalHeight - offsets[end] }}>
+                    {items.slice(start, end).map((item, i) => {
+                        const key = getKey(item);
+                        return (
+                            <div
+                                key={key}
+                                role="listitem"
+                                className={rowClassName}
+                                ref={(el) => el ? rowRefs.current.set(key, el) : rowRefs.current.delete(key)}
+                            >
+                                {renderItem(item, start + i)}
+                            </div>
+                        );
+                    })}
+                </div>
+                {footer}
+            </div>
+        </div>
+    );
+});
+
+const GEMINI_API_KEY = ""; // Canvas will provide this
+// Base model URL; can be pointed at a local mock server for testing
+const GEMINI_MODEL_URL = typeof __gemini_model_url !== 'undefined' ? __gemini_model_url : 'https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash';
+const geminiUrl = (method) => `${GEMINI_MODEL_URL}:${method}?key=${GEMINI_API_KEY}`;
+// Stream chat replies token by token instead of waiting for the complete response
+const STREAM_CHAT_RESPONSES = true;
+
+// Text of the first candidate in a generateContent response, or null if there is none
+const responseText = (result) => {
+    const parts = result?.candidates?.[0]?.content?.parts;
+    return parts && parts.length > 0 ? parts[0].text : null;
+};
+
+// HTTP statuses worth retrying: timeouts, rate limiting and transient server failures
+const AI_RETRYABLE_STATUSES = new Set([408, 429, 500, 502, 503, 504]);
+
+// Error for a non-OK AI response, carrying its status and any Retry-After delay
+const aiResponseError = (response) => {
+    const error = new Error(`AI request failed with status ${response.status}`);
+    error.status = response.status;
+    const retryAfter = Number(response.headers.get('Retry-After'));
+    if (retryAfter > 0) error.retryAfterMs = retryAfter * 1000;
+    return error;
+};
+
+// Network failures (fetch rejects with a TypeError) and retryable statuses can be retried, unless
+// part of a streamed reply has already been shown
+const isRetryableAiError = (error) => !error.partialText && (error.name === 'TypeError' || AI_RETRYABLE_STATUSES.has(error.status));
+
+const generateContent = async (payload, signal) => {
+    const response = await fetch(geminiUrl('generateContent'), {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(payload),
+        signal
+    });
+    if (!response.ok) throw aiResponseError(response);
+    return response.json();
+};
+
+// Parse one server-sent event and return the text it carries, if any
+const sseEventText = (event) => {
+    const data = event
+        .split(/\r?\n/)
+        .filter(line => line.startsWith('data:'))
+        .map(line => line.slice(5).trimStart())
+        .join('\n');
+    if (!data || data === '[DONE]') return '';
+    return responseText(JSON.parse(data)) || '';
+};
+
+// Call streamGenerateContent over SSE. onText receives the accumulated reply after every chunk;
+// the complete reply is returned when the stream ends. If the stream breaks off, the error
+// carries the text received so far as `partialText`.
+const streamGenerateContent = async (payload, onText, signal) => {
+    const response = await fetch(`${geminiUrl('streamGenerateContent')}&alt=sse`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(payload),
+        signal
+    });
+    if (!response.ok) throw aiResponseError(response);
+
+    let text = '';
+    let buffer = '';
+    const consume = (final) => {
+        const events = buffer.split(/\r?\n\r?\n/);
+        buffer = final ? '' : events.pop();
+        events.forEach(event => {
+            const chunk = sseEventText(event);
+            if (chunk) {
+                text += chunk;
+                onText(text);
+            }
+        });
+    };
+
+    if (!response.body || typeof TextDecoder === 'undefined') {
+        buffer = await response.text();
+        consume(true);
+        return text;
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    try {
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            consume(false);
+        }
+    } catch (error) {
+        error.partialText = text;
+        throw error;
+    }
+    buffer += decoder.decode();
+    consume(true);
+    return text;
+};
+
+// Resolve after `ms`, or reject with the signal's reason once it aborts
+const sleep = (ms, signal) => new Promise((resolve, reject) => {
+    if (signal.aborted) {
+        reject(signal.reason);
+        return;
+    }
+    const onAbort = () => {
+        clearTimeout(timer);
+        reject(signal.reason);
+    };
+    const timer = setTimeout(() => {
+        signal.removeEventListener('abort', onAbort);
+        resolve();
+    }, ms);
+    signal.addEventListener('abort', onAbort, { once: true });
+});
+
+// Token bucket holding up to `capacity` tokens, refilled continuously at `refillPerSecond`
+const createTokenBucket = (capacity, refillPerSecond) => {
+    let tokens = capacity;
+    let refilledAt = Date.now();
+
+    // Wait until a token is available, then take it
+    const take = async (signal) => {
+        for (;;) {
+            const now = Date.now();
+            tokens = Math.min(capacity, tokens + ((now - refilledAt) / 1000) * refillPerSecond);
+            refilledAt = now;
+            if (tokens >= 1) {
+                tokens -= 1;
+                return;
+            }
+            await sleep(((1 - tokens) / refillPerSecond) * 1000, signal);
+        }
+    };
+
+    return { take };
+};
+
+// Runs AI requests by key. Each request gets a deadline covering all its attempts and can be
+// cancelled by key; a request whose key is already in flight joins the running one instead of
+// sending a second call. Every attempt takes a token from the rate limiter, and retryable
+// failures are retried with full-jitter exponential backoff (or the server's Retry-After, if
+// longer) as long as the deadline allows.
+const createAiScheduler = ({ bucket, maxAttempts = 4, baseDelayMs = 500, maxDelayMs = 8000, deadlineMs = 30000 }) => {
+    const inFlight = new Map();
+
+    const attempt = async (task, signal, deadline) => {
+        for (let attemptNumber = 1; ; attemptNumber++) {
+            await bucket.take(signal);
+            try {
+                return await task(signal);
+            } catch (error) {
+                if (signal.aborted) throw signal.reason;
+                if (attemptNumber >= maxAttempts || !isRetryableAiError(error)) throw error;
+                const backoff = Math.random() * Math.min(maxDelayMs, baseDelayMs * 2 ** (attemptNumber - 1));
+                const delay = Math.max(backoff, error.retryAfterMs || 0);
+                if (Date.now() + delay >= deadline) throw error;
+                await sleep(delay, signal);
+            }
+        }
+    };
+
+    // Run task(signal), which must pass the signal on to fetch
+    const run = (key, task, { deadlineMs: requestDeadlineMs = deadlineMs } = {}) => {
+        if (inFlight.has(key)) return inFlight.get(key).promise;
+
+        const controller = new AbortController();
+        const timer = setTimeout(() => {
+            controller.abort(new DOMException('AI request deadline exceeded', 'TimeoutError'));
+        }, requestDeadlineMs);
+        const endSpan = perf && perf.span(`ai:${key}`);
+        const promise = attempt(task, controller.signal, Date.now() + requestDeadlineMs).then((result) => {
+            if (endSpan) endSpan();
+            return result;
+        }, (error) => {
+            if (endSpan) endSpan(error);
+            throw error;
+        }).finally(() => {
+            clearTimeout(timer);
+            inFlight.delete(key);
+        });
+        inFlight.set(key, { promise, controller });
+        return promise;
+    };
+
+    const cancel = (key) => {
+        const request = inFlight.get(key);
+        if (request) request.controller.abort(new DOMException('AI request cancelled', 'AbortError'));
+    };
+
+    return { run, cancel };
+};
+
+// Shared by all AI calls: bursts of up to 5 requests, 30 per minute sustained
+const aiScheduler = createAiScheduler({ bucket: createTokenBucket(5, 0.5) });
+
+// Chat replies may stream for a while, so they get a longer deadline than other AI calls
+const CHAT_REQUEST_KEY = 'chat';
+const CHAT_DEADLINE_MS = 60000;
+
+// Promise for the result of an IndexedDB request
+const idbResult = (request) => new Promise((resolve, reject) => {
+    request.onsuccess = () => resolve(request.result);
+    request.onerror = () => reject(request.error);
+});
+
+// Cache of string values by key, with an in-memory LRU tier in front of an IndexedDB tier.
+// Entries expire after ttlMs; beyond persistedEntries the oldest persisted entries are evicted.
+// Without IndexedDB only the memory tier is used.
+const createResponseCache = ({ dbName, memoryEntries, persistedEntries, ttlMs }) => {
+    const STORE_NAME = 'responses';
+    const memory = new Map();
+    const stats = { hits: 0, memoryHits: 0, misses: 0, writes: 0, evictions: 0 };
+    let database = null;
+
+    const openDatabase = () => {
+        if (!database) {
+            database = new Promise((resolve, reject) => {
+                const request = indexedDB.open(dbName, 1);
+                request.onupgradeneeded = () => {
+                    request.result.createObjectStore(STORE_NAME, { keyPath: 'key' }).createIndex('storedAt', 'storedAt');
+                };
+                request.onsuccess = () => resolve(request.result);
+                request.onerror = () => reject(request.error);
+            }).catch(error => {
+                console.error("AI response cache unavailable:", error);
+                return null;
+            });
+        }
+        return database;
+    };
+
+    // Insert or refresh an entry as the most recently used, dropping the least recently used
+    const remember = (entry) => {
+        memory.delete(entry.key);
+        memory.set(entry.key, entry);
+        if (memory.size > memoryEntries) memory.delete(memory.keys().next().value);
+    };
+
+    const get = async (key) => {
+        const fresh = (entry) => entry && Date.now() - entry.storedAt < ttlMs;
+        const cached = memory.get(key);
+        if (fresh(cached)) {
+            remember(cached);
+            stats.hits++;
+            stats.memoryHits++;
+            return cached.value;
+        }
+        memory.delete(key);
+
+        const db = await openDatabase();
+        const persisted = db && await idbResult(db.transaction(STORE_NAME).objectStore(STORE_NAME).get(key)).catch(() => null);
+        if (fresh(persisted)) {
+            remember(persisted);
+            stats.hits++;
+            return persisted.value;
+        }
+        stats.misses++;
+        return null;
+    };
+
+    const set = async (key, value) => {
+        const entry = { key, value, storedAt: Date.now() };
+        remember(entry);
+        stats.writes++;
+
+        const db = await openDatabase();
+        if (!db) return;
+        const store = db.transaction(STORE_NAME, 'readwrite').objectStore(STORE_NAME);
+        store.put(entry);
+        // Walk entries oldest first, deleting expired ones and any beyond the size limit
+        store.count().onsuccess = (event) => {
+            let excess = event.target.result - persistedEntries;
+            const expiredBefore = Date.now() - ttlMs;
+            store.index('storedAt').openCursor().onsuccess = ({ target }) => {
+                const cursor = target.result;
+                if (!cursor || (excess <= 0 && cursor.value.storedAt >= expiredBefore)) return;
+                cursor.delete();
+                excess--;
+                stats.evictions++;
+                cursor.continue();
+            };
+        };
+    };
+
+    return { get, set, getStats: () => ({ ...stats, memoryEntries: memory.size }) };
+};
+
+const aiCache = createResponseCache({
+    dbName: 'wellbeing-hub-ai-cache',
+    memoryEntries: 100,
+    persistedEntries: 1000,
+    ttlMs: 7 * 24 * 60 * 60 * 1000,
+});
+
+if (perf) perf.addStats('aiCache', aiCache.getStats);
+
+// Messages before the prompt that take part in the cache key. Wider windows make hits rarer,
+// since the same question after different exchanges rarely deserves the same answer.
+const AI_CACHE_CONTEXT_MESSAGES = 2;
+
+// Case, punctuation and spacing do not change what is being asked
+const normalizeChatText = (text) => text
+    .normalize('NFKC')
+    .toLowerCase()
+    .replace(/[^\p{L}\p{N}\s]/gu, ' ')
+    .replace(/\s+/g, ' ')
+    .trim();
+
+// Cache key for a chat turn: SHA-256 of the user, the normalized context window and the prompt.
+// Null where SubtleCrypto is unavailable (insecure contexts), which disables caching.
+const chatCacheKey = async (userId, recent) => {
+    if (typeof crypto === 'undefined' || !crypto.subtle) return null;
+    const context = recent.slice(-(AI_CACHE_CONTEXT_MESSAGES + 1)).map(msg => [msg.role, normalizeChatText(msg.text)]);
+    const digest = await crypto.subtle.digest('SHA-256', new TextEncoder().encode(JSON.stringify([userId, context])));
+    return Array.from(new Uint8Array(digest), byte => byte.toString(16).padStart(2, '0')).join('');
+};
+
+// Client-generated chat message id. Ids sort by creation time, so a user message and its reply,
+// which share one server timestamp when committed together, still order correctly.
+const chatMessageId = () => `${Date.now().toString(36).padStart(9, '0')}${Math.random().toString(36).slice(2, 10)}`;
+
+// Write a chat turn (user message and reply) plus any metadata documents in a single batch.
+// Messages use their client-generated ids as document ids, so a retried commit overwrites
+// rather than duplicating them.
+const commitChatTurn = (db, userPath, messages, metadata = []) => {
+    const batch = writeBatch(db);
+    messages.forEach(({ id, role, text }) => {
+        batch.set(doc(db, `${userPath}/chatHistory`, id), { role, text, timestamp: serverTimestamp() });
+    });
+    metadata.forEach(({ path, data }) => batch.set(doc(db, path), data));
+    return batch.commit();
+};
+
+// Most chat messages loaded for the context; only reached while summaries keep failing
+const CHAT_UNSUMMARIZED_LIMIT = 200;
+
+// Load older chat pages until the loaded history reaches back to the summary (or holds
+// CHAT_UNSUMMARIZED_LIMIT messages), so no message between the two is left out of the context.
+// The pages stay in the chat collection, so each is read once per session, not once per turn.
+const loadUnsummarizedChat = async (chatCollection, summary) => {
+    const covered = summary?.coveredUntil ? { id: summary.coveredId || '', timestamp: summary.coveredUntil } : null;
+    for (;;) {
+        const { entries, hasMore, loadMore } = chatCollection.getState();
+        const reached = covered && entries.length > 0 && oldestFirst(entries[0], covered) <= 0;
+        if (!hasMore || reached || entries.length >= CHAT_UNSUMMARIZED_LIMIT) return;
+        await loadMore();
+        // A failed or concurrent load adds nothing; send what is loaded rather than retrying here
+        if (chatCollection.getState().entries.length === entries.length) return;
+    }
+};
+
+// Split the chat into what is sent verbatim and what should be folded into the rolling summary.
+// Messages already covered by the summary are skipped; everything newer is sent verbatim, since
+// overflow beyond CHAT_CONTEXT_CHAR_BUDGET is only dropped once a summary covering it exists.
+// Overflow is folded once it reaches CHAT_SUMMARY_FOLD_CHARS, so the summary is extended in a
+// few larger steps rather than once per turn.
+const selectChatContext = (history, summary, message) => {
+    const covered = summary?.coveredUntil ? { id: summary.coveredId || '', timestamp: summary.coveredUntil } : null;
+    const pending = covered ? history.filter(msg => oldestFirst(msg, covered) > 0) : history;
+
+    let used = message.text.length;
+    let split = pending.length;
+    while (split > 0 && used + pending[split - 1].text.length <= CHAT_CONTEXT_CHAR_BUDGET) {
+        split--;
+        used += pending[split].text.length;
+    }
+
+    const overflow = pending.slice(0, split);
+    const overflowChars = overflow.reduce((total, msg) => total + msg.text.length, 0);
+    return { recent: [...pending, message], toFold: overflowChars >= CHAT_SUMMARY_FOLD_CHARS ? overflow : [] };
+};
+
+const buildChatPayload = (recent, summary) => {
+    const payload = {
+        contents: recent.map(msg => ({
+            role: msg.role,
+            parts: [{ text: msg.text }]
+        }))
+    };
+    if (summary?.text) {
+        payload.systemInstruction = { parts: [{ text: `Summary of the earlier conversation with this user: ${summary.text}` }] };
+    }
+    return payload;
+};
+
+// Extend the rolling summary with turns that no longer fit in the verbatim window
+const extendChatSummary = async (summary, turns) => {
+    const transcript = turns.map(msg => `${msg.role === 'user' ? 'User' : 'AI'}: ${msg.text}`).join('\n');
+    const prompt = [
+        'You maintain a running summary of a supportive well-being conversation between a user and an AI companion.',
+        'Update the summary with the new turns below. Keep the feelings, events, goals and advice that matter for later turns.',
+        `Reply with the updated summary only, in under ${Math.floor(CHAT_SUMMARY_MAX_CHARS / 6)} words.`,
+        '',
+        `Current summary: ${summary?.text || '(none)'}`,
+        '',
+        'New turns:',
+        transcript,
+    ].join('\n');
+
+    const payload = { contents: [{ role: 'user', parts: [{ text: prompt }] }] };
+    const result = await aiScheduler.run('chat-summary', signal => generateContent(payload, signal));
+    const text = responseText(result);
+    if (!text) throw new Error('Empty summary response');
+
+    const last = turns[turns.length - 1];
+    return {
+        text: text.trim().slice(0, CHAT_SUMMARY_MAX_CHARS),
+        coveredUntil: last.timestamp,
+        coveredId: last.id,
+        messageCount: (summary?.messageCount || 0) + turns.length,
+        updatedAt: serverTimestamp(),
+    };
+};
+
+// Chat session: paged history merged with optimistic messages, the rolling summary, and sending.
+// Turn state (loadingChat, streamingText, optimistic messages, an unsaved summary) lives in the
+// app store, so it survives the chat view unmounting while a reply is still on its way.
+const useChat = (db, userId) => {
+    const userPath = userPathFor(userId);
+    const pendingChat = useStore(appStore, s => s.pendingChat);
+    const pendingSummary = useStore(appStore, s => s.pendingSummary);
+    const storedSummary = useLiveDocument(db, userPath && `${userPath}/chatSummary/rolling`);
+    // An extended summary waiting for the next chat batch is newer than the stored one
+    const chatSummary = pendingSummary || storedSummary;
+
+    // Chat is displayed oldest first
+    const chatPages = usePagedCollection(db, userPath && `${userPath}/chatHistory`, { compare: oldestFirst, trackPendingWrites: true });
+    const { hasEntry: hasChatEntry, removeEntries: removeChatEntries } = chatPages;
+
+    // Messages older than the retention period are archived once per session, and again
+    // whenever the period changes
+    const chatSettings = useLiveDocument(db, userPath && `${userPath}/settings/chat`);
+    const retentionDays = chatSettings?.retentionDays || null;
+    useEffect(() => {
+        const compactionKey = `${userPath}:${retentionDays}`;
+        if (!db || !userPath || !retentionDays || compactionsStarted.has(compactionKey)) return;
+        compactionsStarted.add(compactionKey);
+        compactChatHistory(db, userPath, retentionDays).then(removeChatEntries).catch(error => {
+            compactionsStarted.delete(compactionKey);
+            console.error("Error compacting chat history:", error);
+        });
+    }, [db, userPath, retentionDays, removeChatEntries]);
+
+    const setRetentionDays = (days) => {
+        setDoc(doc(db, `${userPath}/settings/chat`), { retentionDays: days }, { merge: true }).catch(error => {
+            console.error("Error saving chat retention:", error);
+        });
+    };
+
+    const deleteAll = async () => {
+        const deleted = await deleteChatHistory(db, userPath);
+        removeChatEntries(deleted);
+        return deleted;
+    };
+
+    // Optimistic chat messages are shown until the snapshot delivers the same ids, so a message
+    // is never listed twice; afterwards the snapshot's hasPendingWrites flag drives its state.
+    const chatHistory = useMemo(() => {
+        const unsynced = pendingChat.filter(msg => !hasChatEntry(msg.id));
+        return unsynced.length > 0 ? [...chatPages.entries, ...unsynced] : chatPages.entries;
+    }, [chatPages.entries, pendingChat, hasChatEntry]);
+
+    useEffect(() => {
+        appStore.setState(({ pendingChat: prev }) => {
+            const unsynced = prev.filter(msg => !hasChatEntry(msg.id));
+            return { pendingChat: unsynced.length === prev.length ? prev : unsynced };
+        });
+    }, [chatPages.entries, hasChatEntry]);
+
+    // The extended summary is used right away and persisted with the next chat turn's batch
+    const foldChatSummary = async (turns) => {
+        if (appStore.getState().summarizing) return;
+        appStore.setState({ summarizing: true });
+        try {
+            const next = await extendChatSummary(chatSummary, turns);
+            appStore.setState({ pendingSummary: next });
+        } catch (error) {
+            console.error("Error updating chat summary:", error);
+        } finally {
+            appStore.setState({ summarizing: false });
+        }
+    };
+
+    // Handle chat message submission. With `fresh` the reply is always generated, never reused.
+    const sendMessage = async (text, { fresh = false } = {}) => {
+        if (!text.trim() || appStore.getState().loadingChat || !db || !userId) return;
+
+        const userMessage = { id: chatMessageId(), role: 'user', text, timestamp: Timestamp.now(), pending: true };
+        appStore.setState(({ pendingChat: prev }) => ({ pendingChat: [...prev, userMessage] }));
+        appStore.setState({ loadingChat: true });
+        const turnStarted = performance.now();
+        let firstTokenAt = null;
+        let cached = false;
+
+        let streamedText = '';
+        let replyText;
+        try {
+            const chatCollection = getPagedCollection(`${userPath}/chatHistory`);
+            await loadUnsummarizedChat(chatCollection, chatSummary);
+            const unsynced = chatHistory.filter(msg => !msg.failed && !hasChatEntry(msg.id));
+            const sent = [...chatCollection.getState().entries, ...unsynced];
+            const { recent, toFold } = selectChatContext(sent, chatSummary, userMessage);
+            const payload = buildChatPayload(recent, chatSummary);
+            const useCache = !fresh && appStore.getState().reuseAiAnswers;
+            const cacheKey = useCache ? await chatCacheKey(userId, recent) : null;
+            const cachedReply = cacheKey ? await aiCache.get(cacheKey) : null;
+            const aiResponseText = cachedReply !== null ? cachedReply : await aiScheduler.run(CHAT_REQUEST_KEY, async (signal) => {
+                if (STREAM_CHAT_RESPONSES) {
+                    const streamed = await streamGenerateContent(payload, (partial) => {
+                        if (firstTokenAt === null) firstTokenAt = performance.now();
+                        streamedText = partial;
+                        appStore.setState({ streamingText: partial });
+                    }, signal);
+                    return streamed || null;
+                }
+                const result = await generateContent(payload, signal);
+                if (responseText(result) === null) console.error("Unexpected API response structure:", result);
+                return responseText(result);
+            }, { deadlineMs: CHAT_DEADLINE_MS });
+            cached = cachedReply !== null;
+            if (cacheKey && !cached && aiResponseText !== null) aiCache.set(cacheKey, aiResponseText);
+            replyText = aiResponseText !== null ? aiResponseText : "Sorry, I couldn't generate a response. Please try again.";
+            if (toFold.length > 0) foldChatSummary(toFold);
+        } catch (error) {
+            console.error("Error communicating with AI chatbot:", error);
+            if (!streamedText) {
+                // Nothing to save: the message stays unsent, with the reason, until retried or dismissed
+                const failed = error.name === 'AbortError' ? 'Stopped.'
+                    : error.name === 'TimeoutError' ? 'The AI took too long to respond.'
+                    : "Couldn't reach the AI. Check your network and try again.";
+                appStore.setState(({ pendingChat: prev }) => ({
+                    pendingChat: prev.map(msg => (msg.id === userMessage.id ? { ...msg, failed } : msg)),
+                    loadingChat: false,
+                    streamingText: '',
+                }));
+                return;
+            }
+            // Keep whatever part of a streamed reply arrived before the connection dropped
+            replyText = streamedText;
+        }
+
+        const aiMessage = { id: chatMessageId(), role: 'model', text: replyText, timestamp: Timestamp.now(), pending: true };
+        appStore.setState(({ pendingChat: prev }) => ({ pendingChat: [...prev, aiMessage], loadingChat: false, streamingText: '' }));
+        const repliedAt = performance.now();
+
+        // One batch per turn: both messages plus a summary waiting to be persisted
+        const metadata = [];
+        const summaryToSave = appStore.getState().pendingSummary;
+        if (summaryToSave) {
+            metadata.push({ path: `${userPath}/chatSummary/rolling`, data: summaryToSave });
+        }
+        try {
+            const committed = commitChatTurn(db, userPath, [userMessage, aiMessage], metadata);
+            // The batch is already applied to the local cache, so the stored summary is current
+            if (summaryToSave) appStore.setState({ pendingSummary: null });
+            await committed;
+        } catch (e) {
+            console.error("Error saving chat messages: ", e);
+        }
+        if (perf) {
+            perf.recordChatTurn({
+                cached,
+                firstTokenMs: firstTokenAt === null ? null : firstTokenAt - turnStarted,
+                replyMs: repliedAt - turnStarted,
+                committedMs: performance.now() - turnStarted,
+            });
+        }
+    };
+
+    // Send a failed message again as a new message, asking the model rather than the cache
+    const sendMessageRef = useRef(sendMessage);
+    sendMessageRef.current = sendMessage;
+    const retryMessage = useCallback((msg) => {
+        // sendMessage ignores messages while a reply is in flight; keep the failed one until it can be sent
+        if (appStore.getState().loadingChat) return;
+        dismissChatMessage(msg.id);
+        sendMessageRef.current(msg.text, { fresh: true });
+    }, []);
+
+    return { chatHistory, loadMore: chatPages.loadMore, sendMessage, retryMessage, retentionDays, setRetentionDays, deleteAll };
+};
+
+// Drop an unsent chat message
+const dismissChatMessage = (id) => {
+    appStore.setState(({ pendingChat: prev }) => ({ pendingChat: prev.filter(msg => msg.id !== id) }));
+};
+
+const stopChatReply = () => aiScheduler.cancel(CHAT_REQUEST_KEY);
+
+const setReuseAiAnswers = (reuseAiAnswers) => {
+    appStore.setState({ reuseAiAnswers });
+    writeLocal('reuseAiAnswers', reuseAiAnswers);
+};
+
+const MOODS = ['Happy', 'Neutral', 'Sad', 'Anxious', 'Energetic', 'Tired', 'Calm', 'Stressed'];
+
+// Firestore's limit on operations in one write batch
+const BATCH_LIMIT = 500;
+
+// Set documents in consecutive batches of at most BATCH_LIMIT writes
+const commitInChunks = async (db, writes) => {
+    for (let i = 0; i < writes.length; i += BATCH_LIMIT) {
+        const batch = writeBatch(db);
+        writes.slice(i, i + BATCH_LIMIT).forEach(({ path, data }) => batch.set(doc(db, path), data));
+        await batch.commit();
+    }
+};
+
+const pad2 = (n) => String(n).padStart(2, '0');
+
+// Local calendar day of a date, e.g. "2024-03-09"
+const dayKeyFor = (date) => `${date.getFullYear()}-${pad2(date.getMonth() + 1)}-${pad2(date.getDate())}`;
+
+const parseDayKey = (key) => {
+    const [year, month, day] = key.split('-').map(Number);
+    return new Date(year, month - 1, day);
+};
+
+// The day, ISO week and month rollup buckets a calendar day falls into. Bucket documents are
+// keyed so they sort chronologically, and their `timestamp` is the bucket start, so they can be
+// read newest first like any other history collection.
+const rollupBuckets = (dayKey) => {
+    const day = parseDayKey(dayKey);
+    const weekStart = new Date(day.getFullYear(), day.getMonth(), day.getDate() - ((day.getDay() + 6) % 7));
+    // The ISO week-numbering year is the year of the week's Thursday; week 1 contains January 4th
+    const isoYear = new Date(weekStart.getFullYear(), weekStart.getMonth(), weekStart.getDate() + 3).getFullYear();
+    const jan4 = new Date(isoYear, 0, 4);
+    const week1Start = new Date(isoYear, 0, 4 - ((jan4.getDay() + 6) % 7));
+    const week = 1 + Math.round((weekStart - week1Start) / (7 * 24 * 60 * 60 * 1000));
+
+    return {
+        day: { collection: 'moodDaily', id: dayKey, start: day },
+        week: { collection: 'moodWeekly', id: `${isoYear}-W${pad2(week)}`, start: weekStart },
+        month: {
+            collection: 'moodMonthly',
+            id: dayKey.slice(0, 7),
+            start: new Date(day.getFullYear(), day.getMonth(), 1),
+            // Monthly buckets also count entries per day of the month, for streaks
+            dayOfMonth: dayKey.slice(8),
+        },
+    };
+};
+
+// Calendar day a mood entry is counted under. New entries record it when logged; older entries
+// fall back to their timestamp.
+const moodDayKey = (entry) => entry.day || dayKeyFor(entry.timestamp.toDate());
+
+// Add the rollup updates for one mood entry (delta +1 when logged, -1 when deleted) to a batch.
+// increment() keeps concurrent updates from other tabs or devices from overwriting each other.
+const addRollupWrites = (batch, db, userPath, mood, dayKey, delta) => {
+    Object.values(rollupBuckets(dayKey)).forEach(bucket => {
+        const data = {
+            timestamp: Timestamp.fromDate(bucket.start),
+            counts: { [mood]: increment(delta) },
+            total: increment(delta),
+        };
+        if (bucket.dayOfMonth) data.days = { [bucket.dayOfMonth]: increment(delta) };
+        batch.set(doc(db, `${userPath}/${bucket.collection}`, bucket.id), data, { merge: true });
+    });
+    batch.set(doc(db, `${userPath}/moodStats/summary`), {
+        counts: { [mood]: increment(delta) },
+        total: increment(delta),
+    }, { merge: true });
+};
+
+// Moods are stored as events in one moodLog document per month,
+// { timestamp: month start, events: [{ id, mood, timestamp, day }] }, so a year of history is
+// twelve document reads rather than one per mood. Events are appended with arrayUnion and
+// removed with arrayRemove, which matches whole values, so they are always written with exactly
+// these fields. serverTimestamp() cannot be used inside arrays, so events carry the client time.
+// Moods from the earlier one-document-per-mood layout (moodEntries) are migrated on first use.
+const MOOD_LOG_MONTHS_PER_PAGE = 3;
+
+const toMoodEvent = (entry) => ({ id: entry.id, mood: entry.mood, timestamp: entry.timestamp, day: moodDayKey(entry) });
+
+// Mood events grouped by the month document they belong to
+const groupByMonth = (events) => {
+    const months = new Map();
+    events.forEach(event => {
+        const { month } = rollupBuckets(event.day);
+        if (!months.has(month.id)) months.set(month.id, { month, events: [] });
+        months.get(month.id).events.push(event);
+    });
+    return [...months.values()];
+};
+
+const appendMoodEvents = (batch, db, userPath, month, events) => {
+    batch.set(doc(db, `${userPath}/moodLog`, month.id), {
+        timestamp: Timestamp.fromDate(month.start),
+        events: arrayUnion(...events),
+    }, { merge: true });
+};
+
+// Logged moods the server has not acknowledged yet; shown as pending like other entries
+const setMoodsUnsynced = (ids, unsynced) => appStore.setState(({ unsyncedMoods }) => {
+    const next = new Set(unsyncedMoods);
+    ids.forEach(id => (unsynced ? next.add(id) : next.delete(id)));
+    return { unsyncedMoods: next };
+});
+
+// Log a mood and update its rollups in one atomic batch. A batch rather than a transaction,
+// so it still applies locally and queues while offline.
+const logMood = (db, userId, mood) => {
+    const userPath = userPathFor(userId);
+    const timestamp = Timestamp.now();
+    const day = dayKeyFor(timestamp.toDate());
+    const event = { id: doc(collection(db, `${userPath}/moodLog`)).id, mood, timestamp, day };
+    const batch = writeBatch(db);
+    appendMoodEvents(batch, db, userPath, rollupBuckets(day).month, [event]);
+    addRollupWrites(batch, db, userPath, mood, day, 1);
+    setMoodsUnsynced([event.id], true);
+    return batch.commit().finally(() => setMoodsUnsynced([event.id], false));
+};
+
+// Rollup corrections for deleting many moods at once: one write per affected bucket
+const addRollupRemovals = (batch, db, userPath, entries) => {
+    const buckets = new Map();
+    const summaryCounts = {};
+    const count = (counts, key) => { counts[key] = (counts[key] || 0) + 1; };
+    entries.forEach(entry => {
+        Object.values(rollupBuckets(moodDayKey(entry))).forEach(bucket => {
+            const path = `${userPath}/${bucket.collection}/${bucket.id}`;
+            if (!buckets.has(path)) buckets.set(path, { bucket, counts: {}, days: {}, total: 0 });
+            const totals = buckets.get(path);
+            count(totals.counts, entry.mood);
+            if (bucket.dayOfMonth) count(totals.days, bucket.dayOfMonth);
+            totals.total++;
+        });
+        count(summaryCounts, entry.mood);
+    });
+
+    const decrements = (counts) => Object.fromEntries(Object.entries(counts).map(([key, n]) => [key, increment(-n)]));
+    buckets.forEach(({ bucket, counts, days, total }, path) => {
+        const data = { timestamp: Timestamp.fromDate(bucket.start), counts: decrements(counts), total: increment(-total) };
+        if (bucket.dayOfMonth) data.days = decrements(days);
+        batch.set(doc(db, path), data, { merge: true });
+    });
+    batch.set(doc(db, `${userPath}/moodStats/summary`), {
+        counts: decrements(summaryCounts),
+        total: increment(-entries.length),
+    }, { merge: true });
+};
+
+// Deletes of moods still in the per-document layout correct the rollups in the same batches.
+// A mood touches up to three buckets, so chunks of 100 stay within the batch limit.
+const moodBulkDeleteOptions = (db, userPath) => ({
+    chunkSize: 100,
+    addWrites: (batch, entries) => addRollupRemovals(batch, db, userPath, entries),
+});
+
+// Delete moods with their rollup corrections: one batch per month document, whose rollup
+// writes are bounded by the days in a month. Moods not migrated yet are deleted as documents.
+const deleteMoods = async (db, userPath, entries) => {
+    const legacy = entries.filter(entry => entry.legacy);
+    if (legacy.length > 0) await deleteEntriesInChunks(db, `${userPath}/moodEntries`, legacy, moodBulkDeleteOptions(db, userPath));
+    for (const { month, events } of groupByMonth(entries.filter(entry => !entry.legacy).map(toMoodEvent))) {
+        const batch = writeBatch(db);
+        batch.update(doc(db, `${userPath}/moodLog`, month.id), { events: arrayRemove(...events) });
+        addRollupRemovals(batch, db, userPath, events);
+        await batch.commit();
+    }
+};
+
+// Mood events with timestamps in [from, to] (millis; either bound optional)
+const readMoodEvents = async (db, userPath, { from = null, to = null } = {}) => {
+    const constraints = [orderBy('timestamp')];
+    if (from !== null) constraints.push(where('timestamp', '>=', Timestamp.fromDate(rollupBuckets(dayKeyFor(new Date(from))).month.start)));
+    if (to !== null) constraints.push(where('timestamp', '<=', Timestamp.fromMillis(to)));
+    const snapshot = await getDocs(query(collection(db, `${userPath}/moodLog`), ...constraints));
+    return snapshot.docs
+        .flatMap(docSnap => docSnap.data().events || [])
+        .filter(event => (from === null || event.timestamp.toMillis() >= from) && (to === null || event.timestamp.toMillis() <= to));
+};
+
+// Run a BulkDeleteBar request against the mood log. Returns the deleted ids.
+const bulkDeleteMoods = async (db, userPath, log, request) => {
+    let entries;
+    let legacyIds = [];
+    if (request.ids) {
+        const selected = new Set(request.ids);
+        entries = log.entries.filter(entry => selected.has(entry.id));
+    } else {
+        entries = await readMoodEvents(db, userPath, request);
+        legacyIds = await deleteEntryRange(db, `${userPath}/moodEntries`, { from: request.from, to: request.to, ...moodBulkDeleteOptions(db, userPath) });
+    }
+    await deleteMoods(db, userPath, entries);
+    const deleted = [...entries.map(entry => entry.id), ...legacyIds];
+    log.removeEntries(deleted);
+    return deleted;
+};
+
+const MOOD_MIGRATION_PAGE_SIZE = 400;
+
+// Move moods from the per-document layout into moodLog, a page at a time. A page's appends and
+// deletes commit together, so moods are never lost or doubled; the rollups already count them.
+// Documents without a mood or timestamp are left where they are.
+const migrateMoodEntries = async (db, userPath) => {
+    let last = null;
+    for (;;) {
+        const page = last ? [startAfter(last), limit(MOOD_MIGRATION_PAGE_SIZE)] : [limit(MOOD_MIGRATION_PAGE_SIZE)];
+        const snapshot = await getDocs(query(collection(db, `${userPath}/moodEntries`), ...page));
+        const moods = snapshot.docs.filter(docSnap => docSnap.get('mood') && docSnap.get('timestamp'));
+        if (moods.length > 0) {
+            const batch = writeBatch(db);
+            groupByMonth(moods.map(docSnap => toMoodEvent({ id: docSnap.id, ...docSnap.data() })))
+                .forEach(({ month, events }) => appendMoodEvents(batch, db, userPath, month, events));
+            moods.forEach(docSnap => batch.delete(docSnap.ref));
+            await batch.commit();
+        }
+        if (snapshot.size < MOOD_MIGRATION_PAGE_SIZE) return;
+        last = snapshot.docs[snapshot.docs.length - 1];
+    }
+};
+
+// Users whose migration has been started this session
+const moodMigrationsStarted = new Set();
+
+// Whether a user still has moods in the per-document layout. Checked once per session with a
+// one-document read, so the legacy listener is only attached for users who still need migrating.
+const legacyMoodChecks = new Map();
+
+const hasLegacyMoods = (db, userPath) => {
+    if (!legacyMoodChecks.has(userPath)) {
+        legacyMoodChecks.set(userPath, getDocs(query(collection(db, `${userPath}/moodEntries`), limit(1)))
+            .then(snapshot => !snapshot.empty)
+            .catch(error => {
+                legacyMoodChecks.delete(userPath);
+                console.error("Error checking for legacy mood entries:", error);
+                return false;
+            }));
+    }
+    return legacyMoodChecks.get(userPath);
+};
+
+// The merged mood history in an entry store. Each update applies only what changed: the events of
+// month documents that changed (month entries keep their identity while unchanged), legacy
+// entries added or removed, and moods whose pending flag flipped. Month events take precedence
+// over a legacy copy of the same mood during migration.
+const createMoodHistory = () => {
+    const store = createEntryStore(newestFirst);
+    let months = new Map();
+    let legacy = new Map();
+    let unsynced = new Set();
+    // Month id of every applied month event
+    const eventMonths = new Map();
+
+    const update = (monthEntries, legacyEntries, unsyncedMoods) => {
+        const removed = [];
+        const upserted = [];
+        const flipped = [...unsynced, ...unsyncedMoods].filter(id => unsynced.has(id) !== unsyncedMoods.has(id));
+        unsynced = unsyncedMoods;
+        const dropEvent = (event) => {
+            removed.push(event.id);
+            eventMonths.delete(event.id);
+        };
+
+        const nextMonths = new Map(monthEntries.map(month => [month.id, month]));
+        months.forEach((month, id) => {
+            if (!nextMonths.has(id)) (month.events || []).forEach(dropEvent);
+        });
+        nextMonths.forEach((month, id) => {
+            const prior = months.get(id);
+            if (prior === month) return;
+            const events = month.events || [];
+            const ids = new Set(events.map(event => event.id));
+            (prior?.events || []).forEach(event => {
+                if (!ids.has(event.id)) dropEvent(event);
+            });
+            events.forEach(event => {
+                eventMonths.set(event.id, id);
+                upserted.push({ ...event, pending: unsynced.has(event.id) });
+            });
+        });
+        months = nextMonths;
+
+        const nextLegacy = new Map(legacyEntries.map(entry => [entry.id, entry]));
+        legacy.forEach((entry, id) => {
+            if (!nextLegacy.has(id) && !eventMonths.has(id)) removed.push(id);
+        });
+        nextLegacy.forEach((entry, id) => {
+            if (legacy.get(id) !== entry && !eventMonths.has(id)) upserted.push({ ...entry, legacy: true });
+        });
+        legacy = nextLegacy;
+
+        flipped.forEach(id => {
+            const current = eventMonths.has(id) && store.get(id);
+            if (current) upserted.push({ ...current, pending: unsynced.has(id) });
+        });
+
+        const list = store.removeMany(removed);
+        return upserted.length ? store.upsertMany(upserted) : list;
+    };
+
+    return { update };
+};
+
+// The mood history, newest first: events of the loaded month documents merged with any moods
+// still in the per-document layout. Events keep their identity while unchanged, so memoized rows
+// do not re-render when another event of their month changes.
+const useMoodLog = (db, userPath) => {
+    const months = usePagedCollection(db, userPath && `${userPath}/moodLog`, { pageSize: MOOD_LOG_MONTHS_PER_PAGE });
+    const [legacyCheck, setLegacyCheck] = useState({ userPath: null, found: false });
+    const legacyFound = legacyCheck.userPath === userPath && legacyCheck.found;
+    const legacy = usePagedCollection(db, legacyFound ? `${userPath}/moodEntries` : null);
+    const unsyncedMoods = useStore(appStore, s => s.unsyncedMoods);
+    const historyRef = useRef(null);
+    if (!historyRef.current) historyRef.current = createMoodHistory();
+
+    useEffect(() => {
+        if (!db || !userPath) return;
+        let cancelled = false;
+        hasLegacyMoods(db, userPath).then(found => {
+            if (!cancelled) setLegacyCheck({ userPath, found });
+        });
+        return () => {
+            cancelled = true;
+        };
+    }, [db, userPath]);
+
+    useEffect(() => {
+        if (!db || !userPath || legacy.entries.length === 0 || moodMigrationsStarted.has(userPath)) return;
+        moodMigrationsStarted.add(userPath);
+        migrateMoodEntries(db, userPath).then(() => {
+            // Everything is in moodLog now, so the legacy listener can go
+            legacyMoodChecks.set(userPath, Promise.resolve(false));
+            setLegacyCheck({ userPath, found: false });
+        }).catch(error => {
+            moodMigrationsStarted.delete(userPath);
+            console.error("Error migrating mood entries:", error);
+        });
+    }, [db, userPath, legacy.entries.length]);
+
+    const entries = useMemo(
+        () => historyRef.current.update(months.entries, legacy.entries, unsyncedMoods),
+        [months.entries, legacy.entries, unsyncedMoods]
+    );
+
+    // Older month documents are fetched once, so removed events are dropped from them locally
+    const { replaceEntry } = months;
+    const removeLegacyEntries = legacy.removeEntries;
+    const removeEntries = useCallback((ids) => {
+        const removed = new Set(ids);
+        months.entries.forEach(month => {
+            const events = month.events || [];
+            if (events.some(event => removed.has(event.id))) {
+                replaceEntry({ ...month, events: events.filter(event => !removed.has(event.id)) });
+            }
+        });
+        removeLegacyEntries(ids);
+    }, [months.entries, replaceEntry, removeLegacyEntries]);
+
+    return { entries, hasMore: months.hasMore, loadingMore: months.loadingMore, loadMore: months.loadMore, removeEntries };
+};
+
+// Rollup documents for a set of moods, keyed by path, plus the summary
+const computeMoodRollups = (userPath, moods) => {
+    const buckets = new Map();
+    const summary = { counts: {}, total: 0 };
+
+    moods.forEach(entry => {
+        if (!entry.mood || (!entry.day && !entry.timestamp)) return;
+        Object.values(rollupBuckets(moodDayKey(entry))).forEach(bucket => {
+            const path = `${userPath}/${bucket.collection}/${bucket.id}`;
+            if (!buckets.has(path)) {
+                buckets.set(path, { timestamp: Timestamp.fromDate(bucket.start), counts: {}, total: 0 });
+            }
+            const data = buckets.get(path);
+            data.counts[entry.mood] = (data.counts[entry.mood] || 0) + 1;
+            data.total++;
+            if (bucket.dayOfMonth) {
+                data.days = data.days || {};
+                data.days[bucket.dayOfMonth] = (data.days[bucket.dayOfMonth] || 0) + 1;
+            }
+        });
+        summary.counts[entry.mood] = (summary.counts[entry.mood] || 0) + 1;
+        summary.total++;
+    });
+
+    buckets.set(`${userPath}/moodStats/summary`, { ...summary, backfilledAt: serverTimestamp() });
+    return buckets;
+};
+
+// Moods by id from moodLog month snapshots and legacy moodEntries documents. A mood being
+// migrated may briefly be in both layouts.
+const collectMoods = (monthSnaps, legacyDocs) => {
+    const moods = new Map();
+    monthSnaps.forEach(docSnap => (docSnap.data()?.events || []).forEach(event => moods.set(event.id, event)));
+    legacyDocs.forEach(docSnap => moods.set(docSnap.id, docSnap.data()));
+    return moods;
+};
+
+// Rebuild all mood rollups from the raw entries: a one-time O(entries) pass for moods logged
+// before rollups existed. Bucket documents are overwritten, so it is safe to run again; the
+// summary's backfilledAt marker is written last, so an interrupted run is simply repeated.
+// Each chunk of rollup documents is written in a transaction that reads the moodLog months, so a
+// mood logged or deleted meanwhile makes the transaction run again instead of its increment being
+// overwritten. Moods only ever move out of moodEntries into moodLog, so that is read just once.
+const backfillMoodRollups = async (db, userPath) => {
+    const [legacy, months] = await Promise.all([
+        getDocs(collection(db, `${userPath}/moodEntries`)),
+        getDocs(collection(db, `${userPath}/moodLog`)),
+    ]);
+    const monthRefs = months.docs.map(docSnap => docSnap.ref);
+    // New moods land in the current month, which may not exist yet
+    const currentMonth = rollupBuckets(dayKeyFor(new Date())).month.id;
+    if (!months.docs.some(docSnap => docSnap.id === currentMonth)) monthRefs.push(doc(db, `${userPath}/moodLog`, currentMonth));
+
+    const initial = computeMoodRollups(userPath, collectMoods(months.docs, legacy.docs));
+    const paths = [...initial.keys()];
+    for (let i = 0; i < paths.length; i += BATCH_LIMIT) {
+        const chunk = paths.slice(i, i + BATCH_LIMIT);
+        await runTransaction(db, async (transaction) => {
+            const monthSnaps = await Promise.all(monthRefs.map(ref => transaction.get(ref)));
+            const rollups = computeMoodRollups(userPath, collectMoods(monthSnaps, legacy.docs));
+            chunk.forEach(path => {
+                // A bucket whose moods were all deleted meanwhile is emptied
+                const start = initial.get(path);
+                const data = rollups.get(path) || { ...start, counts: {}, total: 0, ...(start.days ? { days: {} } : {}) };
+                transaction.set(doc(db, path), data);
+            });
+        });
+    }
+};
+
+// Users whose backfill has been started this session
+const backfillsStarted = new Set();
+
+// Consecutive days with a mood logged, ending today (or yesterday if nothing is logged yet today).
+// Computed from monthly rollups (newest first); `open` means the run reaches past the oldest
+// loaded month, so older months may extend it.
+const moodStreak = (months) => {
+    const logged = new Set();
+    months.forEach(month => {
+        Object.entries(month.days || {}).forEach(([day, count]) => {
+            if (count > 0) logged.add(`${month.id}-${day}`);
+        });
+    });
+
+    const cursor = new Date();
+    if (!logged.has(dayKeyFor(cursor))) cursor.setDate(cursor.getDate() - 1);
+    let streak = 0;
+    while (logged.has(dayKeyFor(cursor))) {
+        streak++;
+        cursor.setDate(cursor.getDate() - 1);
+    }
+    const oldest = months[months.length - 1];
+    return { streak, open: streak > 0 && !!oldest && dayKeyFor(cursor).slice(0, 7) < oldest.id };
+};
+
+const dayLabelFormat = new Intl.DateTimeFormat(undefined, { weekday: 'short', day: 'numeric' });
+const monthLabelFormat = new Intl.DateTimeFormat(undefined, { month: 'short', year: '2-digit' });
+
+const TREND_RANGES = {
+    day: { title: 'Days', collection: 'moodDaily', count: 7, label: (bucket) => dayLabelFormat.format(bucket.start) },
+    week: { title: 'Weeks', collection: 'moodWeekly', count: 8, label: (bucket) => `W${bucket.id.slice(-2)}` },
+    month: { title: 'Months', collection: 'moodMonthly', count: 6, label: (bucket) => monthLabelFormat.format(bucket.start) },
+};
+
+// The most recent `count` buckets of a range, newest first, including empty ones
+const recentBuckets = (range, count) => {
+    const buckets = [];
+    const date = new Date();
+    for (let i = 0; i < count; i++) {
+        buckets.push(rollupBuckets(dayKeyFor(date))[range]);
+        if (range === 'day') {
+            date.setDate(date.getDate() - 1);
+        } else if (range === 'week') {
+            date.setDate(date.getDate() - 7);
+        } else {
+            date.setMonth(date.getMonth() - 1, 1);
+        }
+    }
+    return buckets;
+};
+
+const MOOD_COLORS = {
+    Happy: 'bg-yellow-400',
+    Neutral: 'bg-gray-400',
+    Sad: 'bg-blue-500',
+    Anxious: 'bg-orange-400',
+    Energetic: 'bg-green-500',
+    Tired: 'bg-indigo-300',
+    Calm: 'bg-teal-400',
+    Stressed: 'bg-red-500',
+};
+
+// Journal search. The inverted index lives in a Web Worker so indexing and queries never block
+// rendering, and is persisted to IndexedDB so it only has to catch up with new entries on load.
+// The worker source is this function's text, so it must not reference anything outside itself.
+const journalSearchWorker = () => {
+    const DB_NAME = 'wellbeing-hub-search';
+    const STORE_NAME = 'indexes';
+    const PERSIST_DELAY_MS = 1000;
+
+    let key = null;
+    let docs = new Map();      // id -> { time, content, tokens }
+    let postings = new Map();  // token -> Set of ids
+    let vocabulary = null;     // sorted tokens for prefix lookups, rebuilt when tokens come or go
+    let syncedUntil = 0;       // every entry up to this timestamp (millis) has been indexed
+    let persistTimer = null;
+
+    // Lowercased words with diacritics folded, so "Café" matches "cafe"
+    const tokenize = (text) => (text || '')
+        .toLowerCase()
+        .normalize('NFKD')
+        .replace(/[\u0300-\u036f]/g, '')
+        .split(/[^\p{L}\p{N}]+/u)
+        .filter(Boolean);
+
+    const withStore = (mode, run) => new Promise((resolve, reject) => {
+        const request = indexedDB.open(DB_NAME, 1);
+        request.onupgradeneeded = () => request.result.createObjectStore(STORE_NAME);
+        request.onerror = () => reject(request.error);
+        request.onsuccess = () => {
+            const database = request.result;
+            const transaction = database.transaction(STORE_NAME, mode);
+            const operation = run(transaction.objectStore(STORE_NAME));
+            transaction.oncomplete = () => {
+                database.close();
+                resolve(operation.result);
+            };
+            transaction.onerror = () => {
+                database.close();
+                reject(transaction.error);
+            };
+        };
+    });
+
+    const load = async (indexKey) => {
+        key = indexKey;
+        try {
+            const saved = await withStore('readonly', store => store.get(key));
+            if (saved) {
+                ({ docs, postings, syncedUntil } = saved);
+            }
+        } catch (error) {
+            console.error("Error loading journal search index:", error);
+        }
+        vocabulary = null;
+        self.postMessage({ type: 'ready', syncedUntil });
+    };
+
+    // Coalesce bursts of updates into one write
+    const persist = () => {
+        clearTimeout(persistTimer);
+        persistTimer = setTimeout(() => {
+            withStore('readwrite', store => store.put({ docs, postings, syncedUntil }, key)).catch(error => {
+                console.error("Error saving journal search index:", error);
+            });
+        }, PERSIST_DELAY_MS);
+    };
+
+    const removeDoc = (id) => {
+        const indexed = docs.get(id);
+        if (!indexed) return;
+        indexed.tokens.forEach(token => {
+            const ids = postings.get(token);
+            ids.delete(id);
+            if (ids.size === 0) {
+                postings.delete(token);
+                vocabulary = null;
+            }
+        });
+        docs.delete(id);
+    };
+
+    const upsertDoc = ({ id, content, time }) => {
+        const indexed = docs.get(id);
+        if (indexed && indexed.content === content && indexed.time === time) return;
+        removeDoc(id);
+        const tokens = [...new Set(tokenize(content))];
+        tokens.forEach(token => {
+            if (!postings.has(token)) {
+                postings.set(token, new Set());
+                vocabulary = null;
+            }
+            postings.get(token).add(id);
+        });
+        docs.set(id, { time, content, tokens });
+    };
+
+    // Ids of entries containing a word that starts with `prefix`
+    const matchPrefix = (prefix) => {
+        if (!vocabulary) vocabulary = [...postings.keys()].sort();
+        let low = 0;
+        let high = vocabulary.length;
+        while (low < high) {
+            const mid = (low + high) >> 1;
+            if (vocabulary[mid] < prefix) low = mid + 1;
+            else high = mid;
+        }
+        const ids = new Set();
+        for (let i = low; i < vocabulary.length && vocabulary[i].startsWith(prefix); i++) {
+            postings.get(vocabulary[i]).forEach(id => ids.add(id));
+        }
+        return ids;
+    };
+
+    // Entries matching every term as a prefix, within [from, to], newest first
+    const search = ({ text, from, to, limit }) => {
+        const matchesByTerm = [...new Set(tokenize(text))].map(matchPrefix).sort((a, b) => a.size - b.size);
+        let ids = matchesByTerm.length ? [...matchesByTerm[0]] : [...docs.keys()];
+        matchesByTerm.slice(1).forEach(matches => {
+            ids = ids.filter(id => matches.has(id));
+        });
+
+        const results = [];
+        ids.forEach(id => {
+            const { time, content } = docs.get(id);
+            if ((from == null || time >= from) && (to == null || time <= to)) results.push({ id, time, content });
+        });
+        results.sort((a, b) => b.time - a.time);
+        return { total: results.length, results: results.slice(0, limit) };
+    };
+
+    // Messages are handled strictly in order, so updates and queries wait for the index to load
+    let queue = Promise.resolve();
+    self.onmessage = ({ data }) => {
+        queue = queue.then(async () => {
+            if (data.type === 'load') {
+                await load(data.key);
+            } else if (data.type === 'update') {
+                data.changes.forEach(change => (change.type === 'remove' ? removeDoc(change.id) : upsertDoc(change)));
+                persist();
+            } else if (data.type === 'synced') {
+                syncedUntil = Math.max(syncedUntil, data.until);
+                persist();
+            } else if (data.type === 'query') {
+                const started = performance.now();
+                const result = search(data);
+                self.postMessage({ type: 'results', requestId: data.requestId, ...result, took: performance.now() - started });
+            }
+        });
+    };
+};
+
+const SEARCH_RESULT_LIMIT = 50;
+// Catch-up starts this far before the sync watermark, allowing for clock skew between devices
+const SEARCH_SYNC_MARGIN_MS = 60 * 1000;
+// Bumped when the persisted index format or its sync rules change, so old indexes are rebuilt
+const SEARCH_INDEX_VERSION = 2;
+// Firestore's limit on values in one `in` filter
+const FIRESTORE_IN_LIMIT = 30;
+
+// The journal's search index. Catch-up runs one at a time, on every attach of the journal listener
+// and after imports. Results are checked against Firestore before they are shown: the index may
+// still hold entries deleted on another device or outside the live window, or another tab's copy
+// of the index may have been saved last. Every entry is confirmed once per session (entries the
+// index receives from Firestore count as confirmed) and missing ones are dropped from the index.
+// recheck() forgets confirmations for entries that left the live window, which may or may not
+// have been deleted. Offline, entries that cannot be confirmed are shown as indexed.
+const createJournalSearch = (path) => {
+    const source = `(${journalSearchWorker.toString()})();`;
+    const worker = new Worker(URL.createObjectURL(new Blob([source], { type: 'text/javascript' })));
+    const requests = new Map();
+    let nextRequestId = 0;
+    // Bumped on every index update, so open searches know to run again
+    let version = 0;
+    const listeners = new Set();
+    const confirmedIds = new Set();
+    let syncedUntil = 0;
+    let catchingUp = Promise.resolve();
+    let resolveReady;
+    const ready = new Promise(resolve => { resolveReady = resolve; });
+    let resolveDb;
+    const dbReady = new Promise(resolve => { resolveDb = resolve; });
+
+    worker.onmessage = ({ data }) => {
+        if (data.type === 'ready') {
+            syncedUntil = data.syncedUntil;
+            resolveReady();
+        } else if (data.type === 'results') {
+            requests.get(data.requestId)(data);
+            requests.delete(data.requestId);
+        }
+    };
+    worker.postMessage({ type: 'load', key: `${path}@${SEARCH_INDEX_VERSION}` });
+
+    const changed = () => {
+        version++;
+        listeners.forEach(listener => listener());
+    };
+
+    const update = (changes) => {
+        if (!changes.length) return;
+        changes.forEach(change => (change.type === 'remove' ? confirmedIds.delete(change.id) : confirmedIds.add(change.id)));
+        worker.postMessage({ type: 'update', changes });
+        changed();
+    };
+
+    const recheck = (ids) => {
+        if (!ids.length) return;
+        ids.forEach(id => confirmedIds.delete(id));
+        changed();
+    };
+
+    const runQuery = (options) => new Promise(resolve => {
+        const requestId = ++nextRequestId;
+        requests.set(requestId, resolve);
+        worker.postMessage({ type: 'query', requestId, ...options });
+    });
+
+    // Ids among `ids` that exist in Firestore, or cannot be checked while offline
+    const confirm = async (ids) => {
+        const db = await dbReady;
+        const unknown = ids.filter(id => !confirmedIds.has(id));
+        const unconfirmable = new Set();
+        for (let i = 0; i < unknown.length; i += FIRESTORE_IN_LIMIT) {
+            const chunk = unknown.slice(i, i + FIRESTORE_IN_LIMIT);
+            const snapshot = await getDocs(query(collection(db, path), where(documentId(), 'in', chunk)));
+            const found = new Set(snapshot.docs.map(docSnap => docSnap.id));
+            found.forEach(id => confirmedIds.add(id));
+            const missing = chunk.filter(id => !found.has(id));
+            if (snapshot.metadata.fromCache) {
+                missing.forEach(id => unconfirmable.add(id));
+            } else {
+                update(missing.map(id => ({ type: 'remove', id })));
+            }
+        }
+        return new Set(ids.filter(id => confirmedIds.has(id) || unconfirmable.has(id)));
+    };
+
+    return {
+        path,
+        ready,
+        update,
+        recheck,
+        subscribe: (listener) => {
+            listeners.add(listener);
+            return () => listeners.delete(listener);
+        },
+        getVersion: () => version,
+        // Index entries written since the watermark (or since `sinceMillis`), after any catch-up
+        // already running
+        catchUp: (db, sinceMillis = null) => {
+            resolveDb(db);
+            const run = catchingUp.then(async () => {
+                await ready;
+                const since = sinceMillis !== null ? sinceMillis : Math.max(0, syncedUntil - SEARCH_SYNC_MARGIN_MS);
+                const newest = await catchUpJournalSearch(db, path, since, update);
+                // Everything up to the newest entry read is now indexed, with no gaps
+                if (newest > syncedUntil) {
+                    syncedUntil = newest;
+                    worker.postMessage({ type: 'synced', until: newest });
+                }
+            });
+            catchingUp = run.catch(error => {
+                console.error("Error indexing journal entries:", error);
+            });
+            return run;
+        },
+        find: async ({ text = '', from = null, to = null, limit: resultLimit = SEARCH_RESULT_LIMIT }) => {
+            const result = await runQuery({ text, from, to, limit: resultLimit });
+            const shown = await confirm(result.results.map(({ id }) => id));
+            return {
+                ...result,
+                results: result.results.filter(({ id }) => shown.has(id)).map(({ id, time, content }) => ({ id, content, timestamp: time })),
+            };
+        },
+    };
+};
+
+const toSearchDoc = (docSnap) => {
+    const data = docSnap.data({ serverTimestamps: 'estimate' });
+    return { type: 'upsert', id: docSnap.id, content: data.content || '', time: timestampMillis(data.timestamp) };
+};
+
+// Pass every journal entry from `sinceMillis` on, oldest first, to `update` in pages of
+// BATCH_LIMIT. Returns the newest timestamp read (0 if none).
+const catchUpJournalSearch = async (db, path, sinceMillis, update) => {
+    const entries = collection(db, path);
+    let last = null;
+    let newest = 0;
+    for (;;) {
+        const start = last ? startAfter(last) : startAt(Timestamp.fromMillis(sinceMillis));
+        const snapshot = await getDocs(query(entries, orderBy('timestamp'), start, limit(BATCH_LIMIT)));
+        const changes = snapshot.docs.map(toSearchDoc);
+        update(changes);
+        if (changes.length) newest = Math.max(newest, changes[changes.length - 1].time);
+        if (snapshot.size < BATCH_LIMIT) return newest;
+        last = snapshot.docs[snapshot.docs.length - 1];
+    }
+};
+
+// Search indexes by journal path; null where workers are unavailable. Each index observes the
+// journal collection for the whole session rather than per view, so snapshots that arrive while
+// the listener idles without a view still reach it, and it catches up on every attach. Entries
+// leaving the live window are only rechecked: the limited live query reports an entry pushed out
+// by a newer one the same way as a deleted one.
+const journalSearches = new Map();
+
+const getJournalSearch = (path) => {
+    if (!journalSearches.has(path)) {
+        let search = null;
+        try {
+            search = createJournalSearch(path);
+        } catch (error) {
+            console.error("Journal search unavailable:", error);
+        }
+        journalSearches.set(path, search);
+        if (search) {
+            getPagedCollection(path, JOURNAL_OPTIONS).observeChanges({
+                // Failures are logged by catchUp and retried on the next attach
+                attached: (db) => search.catchUp(db).catch(() => {}),
+                changed: (docChanges) => {
+                    search.update(docChanges.filter(change => change.type !== 'removed').map(change => toSearchDoc(change.doc)));
+                    search.recheck(docChanges.filter(change => change.type === 'removed').map(change => change.doc.id));
+                },
+                dropped: (ids) => search.recheck(ids),
+                removed: (ids) => search.update(ids.map(id => ({ type: 'remove', id }))),
+            });
+        }
+    }
+    return journalSearches.get(path);
+};
+
+const JOURNAL_OPTIONS = { trackPendingWrites: true };
+
+// Export and import of a user's entries as NDJSON: a header line, then one
+// {"collection", "id", "data"} line per document. Timestamps are written as
+// {"__timestamp": [seconds, nanoseconds]} so they round-trip exactly.
+const EXPORT_FORMAT = 'wellbeing-hub-export';
+// moodEntries only holds moods that have not been migrated to moodLog yet
+const EXPORT_COLLECTIONS = ['moodLog', 'moodEntries', 'journalEntries', 'chatHistory', 'chatArchive'];
+const EXPORT_PAGE_SIZE = 500;
+// Import batches committed at the same time
+const IMPORT_CONCURRENCY = 4;
+
+// Progress of the running export or import, shown by DataPanel
+const reportTransfer = (transfer) => appStore.setState({ transfer });
+
+// Save a Blob through a temporary download link
+const downloadBlob = (blob, fileName) => {
+    const url = URL.createObjectURL(blob);
+    const link = document.createElement('a');
+    link.href = url;
+    link.download = fileName;
+    link.click();
+    setTimeout(() => URL.revokeObjectURL(url), 0);
+};
+
+// Destination for export lines. With the File System Access API pages are written to the chosen
+// file as they are read; otherwise each page becomes a Blob part and the file is downloaded on close.
+const openExportSink = async (fileName) => {
+    if (typeof window.showSaveFilePicker === 'function') {
+        const handle = await window.showSaveFilePicker({
+            suggestedName: fileName,
+            types: [{ description: 'Well-being Hub export', accept: { 'application/x-ndjson': ['.ndjson'] } }],
+        });
+        const writable = await handle.createWritable();
+        return { write: (text) => writable.write(text), close: () => writable.close() };
+    }
+    const parts = [];
+    return {
+        write: async (text) => {
+            parts.push(new Blob([text]));
+        },
+        close: async () => downloadBlob(new Blob(parts, { type: 'application/x-ndjson' }), fileName),
+    };
+};
+
+// Export the collections page by page in (timestamp, id) order. Progress is recorded when the
+// file is closed, including after a failure, so an interrupted export resumes into a new part file
+// with the documents that are still missing.
+const exportUserData = async (db, userPath, { resume = false } = {}) => {
+    const progressKey = `export:${userPath}`;
+    const saved = resume ? readLocal(progressKey) : null;
+    let progress = saved ? { ...saved, part: saved.part + 1 } : { collectionIndex: 0, cursor: null, part: 1, exported: 0 };
+
+    const suffix = progress.part > 1 ? `-part${progress.part}` : '';
+    const sink = await openExportSink(`wellbeing-hub-${dayKeyFor(new Date())}${suffix}.ndjson`);
+    let failure = null;
+    try {
+        await sink.write(`${JSON.stringify({ format: EXPORT_FORMAT, version: 1, part: progress.part, exportedAt: Date.now() })}\n`);
+        while (progress.collectionIndex < EXPORT_COLLECTIONS.length) {
+            const name = EXPORT_COLLECTIONS[progress.collectionIndex];
+            const { cursor } = progress;
+            const constraints = [orderBy('timestamp'), orderBy(documentId())];
+            if (cursor) constraints.push(startAfter(new Timestamp(cursor.seconds, cursor.nanoseconds), cursor.id));
+            const snapshot = await getDocs(query(collection(db, `${userPath}/${name}`), ...constraints, limit(EXPORT_PAGE_SIZE)));
+
+            if (!snapshot.empty) {
+                await sink.write(`${snapshot.docs.map(docSnap => JSON.stringify({ collection: name, id: docSnap.id, data: encodeTimestamps(docSnap.data()) })).join('\n')}\n`);
+            }
+            const last = snapshot.docs[snapshot.docs.length - 1];
+            const lastTimestamp = last && last.get('timestamp');
+            progress = snapshot.size < EXPORT_PAGE_SIZE
+                ? { ...progress, collectionIndex: progress.collectionIndex + 1, cursor: null, exported: progress.exported + snapshot.size }
+                : { ...progress, cursor: { id: last.id, seconds: lastTimestamp.seconds, nanoseconds: lastTimestamp.nanoseconds }, exported: progress.exported + snapshot.size };
+            reportTransfer({ kind: 'export', label: `Exported ${progress.exported} entries`, fraction: progress.collectionIndex / EXPORT_COLLECTIONS.length, running: true });
+        }
+    } catch (error) {
+        failure = error;
+    }
+
+    await sink.close();
+    writeLocal(progressKey, failure ? progress : null);
+    if (failure) throw failure;
+    return progress.exported;
+};
+
+// Import an export file. The file is read as a byte stream and split on newlines, so it is never
+// held in memory whole; documents are written with their original ids in batches of BATCH_LIMIT,
+// IMPORT_CONCURRENCY at a time. The byte offset up to which every batch has committed is recorded
+// per file, and importing the same file again continues from there. Re-written documents are
+// simply overwritten, so overlapping a resumed import is harmless.
+// Imported entries are older than anything the rollups and the search index have caught up with.
+// Each committed batch of journal entries is indexed right away; the progress record notes whether
+// moods or journal entries were committed, so a resumed import still rebuilds the rollups and
+// re-indexes the journal entries an interrupted run wrote.
+const importUserData = async (db, userPath, file) => {
+    const progressKey = `import:${userPath}:${file.name}:${file.size}:${file.lastModified}`;
+    const progress = readLocal(progressKey) || {};
+    const startOffset = progress.offset || 0;
+    let moodsTouched = Boolean(progress.moodsTouched);
+    let journalTouched = Boolean(progress.journalTouched);
+    const resumedAfterJournal = journalTouched;
+    const decoder = new TextDecoder();
+    const inFlight = new Set();
+    const committedEnds = new Map();
+    let committedOffset = startOffset;
+    let batchCount = 0;
+    let nextToCommit = 0;
+    let batch = writeBatch(db);
+    let batchSize = 0;
+    let batchMoods = false;
+    let batchJournal = [];
+    let offset = startOffset;
+    let imported = 0;
+    let sawHeader = startOffset > 0;
+    let search = null;
+
+    const report = () => reportTransfer({ kind: 'import', label: `Imported ${imported} entries`, fraction: file.size ? committedOffset / file.size : 1, running: true });
+
+    // Batches commit out of order; the resume offset only moves past a batch once all earlier ones are done
+    const commitBatch = async () => {
+        if (batchSize === 0) return;
+        const number = batchCount++;
+        const end = offset;
+        const size = batchSize;
+        const moods = batchMoods;
+        const journal = batchJournal;
+        const committing = batch.commit().then(() => {
+            committedEnds.set(number, end);
+            imported += size;
+            while (committedEnds.has(nextToCommit)) {
+                committedOffset = committedEnds.get(nextToCommit);
+                committedEnds.delete(nextToCommit++);
+            }
+            if (moods) moodsTouched = true;
+            if (journal.length) {
+                journalTouched = true;
+                search = search || getJournalSearch(`${userPath}/journalEntries`);
+                if (search) search.update(journal);
+            }
+            writeLocal(progressKey, { offset: committedOffset, moodsTouched, journalTouched });
+            report();
+        });
+        inFlight.add(committing);
+        committing.then(() => inFlight.delete(committing), () => {});
+        batch = writeBatch(db);
+        batchSize = 0;
+        batchMoods = false;
+        batchJournal = [];
+        while (inFlight.size >= IMPORT_CONCURRENCY) await Promise.race(inFlight);
+    };
+
+    const importLine = async (line) => {
+        if (!line.trim()) return;
+        const record = JSON.parse(line, reviveTimestamps);
+        if (!sawHeader) {
+            if (record.format !== EXPORT_FORMAT) throw new Error('Not a Well-being Hub export file');
+            sawHeader = true;
+            return;
+        }
+        if (record.format === EXPORT_FORMAT || !EXPORT_COLLECTIONS.includes(record.collection)) return;
+        const ref = doc(db, `${userPath}/${record.collection}`, record.id);
+        if (record.collection === 'moodLog') {
+            // Merge into the month rather than replace moods logged here since the export
+            batch.set(ref, { ...record.data, events: arrayUnion(...(record.data.events || [])) }, { merge: true });
+        } else {
+            batch.set(ref, record.data);
+        }
+        batchSize++;
+        if (record.collection === 'moodLog' || record.collection === 'moodEntries') batchMoods = true;
+        if (record.collection === 'journalEntries') {
+            batchJournal.push({ type: 'upsert', id: record.id, content: record.data.content || '', time: timestampMillis(record.data.timestamp) });
+        }
+    };
+
+    report();
+    const reader = file.slice(startOffset).stream().getReader();
+    let carry = new Uint8Array(0);
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        let bytes = value;
+        if (carry.length) {
+            bytes = new Uint8Array(carry.length + value.length);
+            bytes.set(carry);
+            bytes.set(value, carry.length);
+        }
+        let lineStart = 0;
+        // A newline byte never occurs inside a multi-byte UTF-8 sequence, so lines can be cut on bytes
+        for (let i = bytes.indexOf(10); i !== -1; i = bytes.indexOf(10, lineStart)) {
+            await importLine(decoder.decode(bytes.subarray(lineStart, i)));
+            offset += i + 1 - lineStart;
+            lineStart = i + 1;
+            if (batchSize >= BATCH_LIMIT) await commitBatch();
+        }
+        carry = bytes.slice(lineStart);
+    }
+    await importLine(decoder.decode(carry));
+    offset += carry.length;
+    await commitBatch();
+    await Promise.all(inFlight);
+
+    if (moodsTouched) await backfillMoodRollups(db, userPath);
+    // Whether an interrupted run's batches reached the index is unknown, so index every entry again
+    if (resumedAfterJournal) {
+        const journalSearch = getJournalSearch(`${userPath}/journalEntries`);
+        if (journalSearch) await journalSearch.catchUp(db, 0);
+    }
+    writeLocal(progressKey, null);
+    return imported;
+};
+
+// Delete one entry. Not awaited, so the confirmation closes at once, offline too.
+const deleteEntry = (db, pages, path, id, type) => {
+    deleteDoc(doc(db, path, id)).then(() => {
+        console.log(`${type} entry deleted successfully!`);
+    }).catch((e) => {
+        console.error(`Error deleting ${type} entry: `, e);
+    });
+    pages.removeEntry(id);
+};
+
+// Delete entries in batches of `chunkSize`. addWrites(batch, chunk) can add writes that must
+// commit together with a chunk's deletes, such as rollup corrections; chunkSize leaves room for them.
+const deleteEntriesInChunks = async (db, path, entries, { chunkSize = BATCH_LIMIT, addWrites } = {}) => {
+    for (let i = 0; i < entries.length; i += chunkSize) {
+        const chunk = entries.slice(i, i + chunkSize);
+        const batch = writeBatch(db);
+        chunk.forEach(entry => batch.delete(doc(db, path, entry.id)));
+        if (addWrites) addWrites(batch, chunk);
+        await batch.commit();
+    }
+};
+
+// Delete the entries with timestamps in [from, to] (millis; either bound optional, both absent
+// for all entries), reading and deleting one page per batch. Returns the deleted ids.
+const deleteEntryRange = async (db, path, { from = null, to = null, chunkSize = BATCH_LIMIT, addWrites } = {}) => {
+    const constraints = [orderBy('timestamp')];
+    if (from !== null) constraints.push(where('timestamp', '>=', Timestamp.fromMillis(from)));
+    if (to !== null) constraints.push(where('timestamp', '<=', Timestamp.fromMillis(to)));
+
+    const deleted = [];
+    let last = null;
+    for (;;) {
+        const page = last ? [startAfter(last), limit(chunkSize)] : [limit(chunkSize)];
+        const snapshot = await getDocs(query(collection(db, path), ...constraints, ...page));
+        const entries = snapshot.docs.map(toEntry);
+        await deleteEntriesInChunks(db, path, entries, { chunkSize, addWrites });
+        entries.forEach(entry => deleted.push(entry.id));
+        if (snapshot.size < chunkSize) return deleted;
+        last = snapshot.docs[snapshot.docs.length - 1];
+    }
+};
+
+// Run a request from BulkDeleteBar: { ids } for selected entries, { from, to } for a date range
+// or {} for everything. Deleted entries are dropped from the loaded pages. Returns the deleted ids.
+const bulkDeleteEntries = async (db, pages, path, request, options) => {
+    let deleted;
+    if (request.ids) {
+        // Selected rows can also come from outside the loaded pages (search results); only the id is needed then
+        const loaded = new Map(pages.entries.map(entry => [entry.id, entry]));
+        await deleteEntriesInChunks(db, path, request.ids.map(id => loaded.get(id) || { id }), options);
+        deleted = request.ids;
+    } else {
+        deleted = await deleteEntryRange(db, path, { from: request.from, to: request.to, ...options });
+    }
+    pages.removeEntries(deleted);
+    return deleted;
+};
+
+const CHAT_RETENTION_OPTIONS = [
+    { days: null, label: 'Keep forever' },
+    { days: 30, label: '30 days' },
+    { days: 90, label: '90 days' },
+    { days: 365, label: '1 year' },
+];
+
+// Archive documents stay below Firestore's 1 MiB document limit, which counts UTF-8 bytes.
+// Each message also costs its field names, id, role and timestamp (well under 100 bytes).
+const CHAT_ARCHIVE_MAX_BYTES = 900000;
+const CHAT_ARCHIVE_MESSAGE_OVERHEAD_BYTES = 100;
+const utf8Encoder = new TextEncoder();
+
+// Move chat messages older than the retention period out of chatHistory into chatArchive
+// documents of consecutive messages. Each archive document is written in the same batch as the
+// deletes of the messages it holds, so an interrupted run never loses or duplicates messages.
+// Archive documents are keyed by their first message and their `timestamp` is that message's,
+// so they sort and export like entries. Returns the archived message ids.
+const compactChatHistory = async (db, userPath, retentionDays) => {
+    const historyPath = `${userPath}/chatHistory`;
+    const cutoff = Timestamp.fromMillis(Date.now() - retentionDays * 24 * 60 * 60 * 1000);
+    const archived = [];
+    let last = null;
+    for (;;) {
+        const page = last ? [startAfter(last), limit(BATCH_LIMIT)] : [limit(BATCH_LIMIT)];
+        const snapshot = await getDocs(query(collection(db, historyPath), where('timestamp', '<', cutoff), orderBy('timestamp'), ...page));
+
+        // Split the page into archives by size, leaving one write per batch for the archive itself
+        const archives = [];
+        let current = null;
+        snapshot.docs.forEach(docSnap => {
+            const { role, text, timestamp } = docSnap.data();
+            const message = { id: docSnap.id, role, text, timestamp };
+            const bytes = utf8Encoder.encode(text).length + CHAT_ARCHIVE_MESSAGE_OVERHEAD_BYTES;
+            if (!current || current.bytes + bytes > CHAT_ARCHIVE_MAX_BYTES || current.messages.length >= BATCH_LIMIT - 1) {
+                current = { bytes: 0, messages: [] };
+                archives.push(current);
+            }
+            current.bytes += bytes;
+            current.messages.push(message);
+        });
+
+        for (const { messages } of archives) {
+            const batch = writeBatch(db);
+            batch.set(doc(db, `${userPath}/chatArchive`, messages[0].id), {
+                timestamp: messages[0].timestamp,
+                until: messages[messages.length - 1].timestamp,
+                messageCount: messages.length,
+                messages,
+            });
+            messages.forEach(message => batch.delete(doc(db, historyPath, message.id)));
+            await batch.commit();
+            messages.forEach(message => archived.push(message.id));
+        }
+
+        if (snapshot.size < BATCH_LIMIT) return archived;
+        last = snapshot.docs[snapshot.docs.length - 1];
+    }
+};
+
+// Users whose chat history was compacted in this session
+const compactionsStarted = new Set();
+
+// Delete the whole chat: messages, archives and the rolling summary
+const deleteChatHistory = async (db, userPath) => {
+    const deleted = await deleteEntryRange(db, `${userPath}/chatHistory`);
+    await deleteEntryRange(db, `${userPath}/chatArchive`);
+    await deleteDoc(doc(db, `${userPath}/chatSummary/rolling`));
+    appStore.setState({ pendingSummary: null });
+    return deleted;
+};
+
+const ConfirmDeleteModal = ({ type, message, onCancel, onConfirm }) => (
+    <div className="fixed inset-0 bg-black bg-opacity-50 flex items-center justify-center p-4 z-50">
+        <div className="bg-white dark:bg-gray-800 rounded-lg p-6 shadow-xl max-w-sm w-full text-center">
+            <h3 className="text-xl font-semibold text-gray-900 dark:text-gray-100 mb-4">Confirm Deletion</h3>
+            <p className="text-gray-700 dark:text-gray-300 mb-6">{message || `Are you sure you want to delete this ${type} entry?`} This action cannot be undone.</p>
+            <div className="flex justify-center gap-4">
+                <button
+                    onClick={onCancel}
+                    className="px-6 py-2 rounded-lg border border-gray-300 dark:border-gray-600 text-gray-700 dark:text-gray-300 hover:bg-gray-100 dark:hover:bg-gray-700 transition-colors duration-200"
+                >
+                    Cancel
+                </button>
+                <button
+                    onClick={onConfirm}
+                    className="px-6 py-2 rounded-lg bg-red-600 text-white hover:bg-red-700 transition-colors duration-200"
+                >
+                    Delete
+                </button>
+            </div>
+        </div>
+    </div>
+);
+
+// Bulk delete controls for a list: selected rows (when `selection` is passed: null while not
+// selecting, else a Set of ids), a date range (when `ranged`) and everything. Each action is
+// confirmed, then handed to onDelete as a bulkDeleteEntries request; onDelete resolves to the deleted ids.
+const BulkDeleteBar = ({ noun, selection, onSelectionChange, onDelete, ranged = true }) => {
+    const [from, setFrom] = useState('');
+    const [to, setTo] = useState('');
+    const [request, setRequest] = useState(null);
+    const [busy, setBusy] = useState(false);
+    const [status, setStatus] = useState('');
+
+    const confirmMessage = !request ? '' : request.ids
+        ? `Are you sure you want to delete ${request.ids.length} selected ${noun}?`
+        : request.from !== undefined
+            ? `Are you sure you want to delete all ${noun} from ${from || 'the beginning'} to ${to || 'today'}?`
+            : `Are you sure you want to delete all your ${noun}?`;
+
+    const run = async () => {
+        const confirmed = request;
+        setRequest(null);
+        setBusy(true);
+        setStatus('Deleting...');
+        try {
+            const deleted = await onDelete(confirmed);
+            setStatus(`Deleted ${deleted.length} ${noun}.`);
+            if (onSelectionChange) onSelectionChange(null);
+        } catch (error) {
+            console.error(`Error deleting ${noun}:`, error);
+            setStatus(`Some ${noun} could not be deleted. Please try again.`);
+        } finally {
+            setBusy(false);
+        }
+    };
+
+    const buttonClassName = 'py-1 px-3 rounded-lg text-xs font-medium bg-gray-200 dark:bg-gray-600 text-gray-700 dark:text-gray-300 hover:bg-gray-300 dark:hover:bg-gray-500 disabled:opacity-50 disabled:cursor-not-allowed';
+    const inputClassName = 'p-1 text-xs border border-gray-300 dark:border-gray-600 rounded bg-white dark:bg-gray-700 text-gray-900 dark:text-gray-100';
+
+    return (
+        <div className="flex flex-wrap items-center gap-2 mb-3 text-xs text-gray-600 dark:text-gray-400">
+            {selection !== undefined && (selection ? (
+                <div className="flex flex-wrap items-center gap-2">
+                    <button className={buttonClassName} disabled={busy || selection.size === 0} onClick={() => setRequest({ ids: [...selection] })}>
+                        Delete selected ({selection.size})
+                    </button>
+                    <button className={buttonClassName} disabled={busy} onClick={() => onSelectionChange(null)}>Cancel</button>
+                </div>
+            ) : (
+                <button className={buttonClassName} disabled={busy} onClick={() => onSelectionChange(new Set())}>Select</button>
+            ))}
+            {ranged && (
+                <div className="flex flex-wrap items-center gap-2">
+                    <input type="date" className={inputClassName} value={from} max={to || undefined} onChange={(e) => setFrom(e.target.value)} title="From" />
+                    <input type="date" className={inputClassName} value={to} min={from || undefined} onChange={(e) => setTo(e.target.value)} title="To" />
+                    <button
+                        className={buttonClassName}
+                        disabled={busy || (!from && !to)}
+                        onClick={() => setRequest({ from: from ? parseDayKey(from).getTime() : null, to: to ? endOfDayMillis(to) : null })}
+                    >
+                        Delete range
+                    </button>
+                </div>
+            )}
+            <button className={buttonClassName} disabled={busy} onClick={() => setRequest({})}>Delete all</button>
+            {status && <span>{status}</span>}
+            {request && <ConfirmDeleteModal message={confirmMessage} onCancel={() => setRequest(null)} onConfirm={run} />}
+        </div>
+    );
+};
+
+const LoadingMore = () => (
+    <p className="text-center text-sm text-gray-500 dark:text-gray-400 py-2">Loading more...</p>
+);
+
+// Row selection for BulkDeleteBar: null while not selecting, else a Set of ids.
+// toggleSelected is stable, so memoized rows only re-render when their own checkbox changes.
+const useSelection = () => {
+    const [selection, setSelection] = useState(null);
+    const toggleSelected = useCallback((id) => setSelection(prev => {
+        const next = new Set(prev);
+        if (next.has(id)) next.delete(id);
+        else next.add(id);
+        return next;
+    }), []);
+    return [selection, setSelection, toggleSelected];
+};
+
+// While selecting, rows get a checkbox bound to `selected` and onToggleSelect
+const SelectBox = ({ entry, selected, onToggleSelect }) => (
+    <input type="checkbox" className="mr-3" checked={selected} onChange={() => onToggleSelect(entry.id)} />
+);
+
+// List rows are memoized: entries keep their identity across snapshots, so a row only
+// re-renders when its own entry changes
+const MoodRow = React.memo(({ entry, onDelete, selected, onToggleSelect }) => (
+    <div className={`flex justify-between items-center bg-gray-50 dark:bg-gray-700 p-4 rounded-lg shadow-sm ${entry.pending ? 'opacity-80' : ''}`}>
+        {onToggleSelect && <SelectBox entry={entry} selected={selected} onToggleSelect={onToggleSelect} />}
+        <span className="font-medium text-gray-800 dark:text-gray-200">{entry.mood}</span>
+        <span className="text-sm text-gray-500 dark:text-gray-400">{formatTimestamp(entry.timestamp)}</span>
+        <button
+            onClick={() => onDelete(entry)}
+            className="text-red-500 hover:text-red-700 text-lg transition-colors duration-200"
+            title="Delete mood entry"
+        >
+            <Icon name="trash" />
+        </button>
+    </div>
+));
+
+const JournalRow = React.memo(({ entry, onDelete, selected, onToggleSelect }) => (
+    <div className={`bg-gray-50 dark:bg-gray-700 p-4 rounded-lg shadow-sm ${entry.pending ? 'opacity-80' : ''}`}>
+        <p className="text-gray-800 dark:text-gray-200 mb-2">
+            {onToggleSelect && <SelectBox entry={entry} selected={selected} onToggleSelect={onToggleSelect} />}
+            {entry.content}
+        </p>
+        <div className="flex justify-between items-center text-sm text-gray-500 dark:text-gray-400">
+            <span>{formatTimestamp(entry.timestamp)}</span>
+            <button
+                onClick={() => onDelete(entry.id)}
+                className="text-red-500 hover:text-red-700 text-lg transition-colors duration-200"
+                title="Delete journal entry"
+            >
+                <Icon name="trash" />
+            </button>
+        </div>
+    </div>
+));
+
+// Retrying is only possible once the reply in flight has finished
+const RetryButton = ({ onClick }) => {
+    const loadingChat = useStore(appStore, s => s.loadingChat);
+    return (
+        <button onClick={onClick} disabled={loadingChat} className="ml-2 underline font-semibold disabled:opacity-50 disabled:cursor-not-allowed">
+            Retry
+        </button>
+    );
+};
+
+const ChatBubble = React.memo(({ msg, onRetry }) => (
+    <div className={`flex ${msg.role === 'user' ? 'justify-end' : 'justify-start'} ${msg.pending && !msg.failed ? 'opacity-80' : ''}`}>
+        <div className={`max-w-[70%] p-3 rounded-lg shadow-sm ${msg.role === 'user' ? 'bg-indigo-500 text-white rounded-br-none' : 'bg-gray-200 dark:bg-gray-600 text-gray-900 dark:text-gray-100 rounded-bl-none'}`}>
+            <p className="text-sm">{msg.text}</p>
+            <span className="block text-xs opacity-75 mt-1">{formatTimestamp(msg.timestamp)}</span>
+            {msg.failed && (
+                <div className="mt-2 pt-2 border-t border-indigo-300 text-xs">
+                    <span>Not sent. {msg.failed}</span>
+                    <RetryButton onClick={() => onRetry(msg)} />
+                    <button onClick={() => dismissChatMessage(msg.id)} className="ml-2 underline">Dismiss</button>
+                </div>
+            )}
+        </div>
+    </div>
+));
+
+// Mood trends and streak, read only from the rollup documents
+const MoodTrends = () => {
+    const db = useStore(appStore, s => s.db);
+    const userId = useStore(appStore, s => s.userId);
+    const [range, setRange] = useState('day');
+    const userPath = userPathFor(userId);
+    const { collection: rollupCollection, count, label } = TREND_RANGES[range];
+
+    const summary = useLiveDocument(db, userPath && `${userPath}/moodStats/summary`);
+    const buckets = usePagedCollection(db, userPath && `${userPath}/${rollupCollection}`, { pageSize: count });
+    const months = usePagedCollection(db, userPath && `${userPath}/moodMonthly`, { pageSize: TREND_RANGES.month.count });
+
+    // Moods logged before rollups existed are counted once, on first use
+    useEffect(() => {
+        if (!db || !userPath || summary === undefined || summary?.backfilledAt || backfillsStarted.has(userPath)) return;
+        backfillsStarted.add(userPath);
+        backfillMoodRollups(db, userPath).catch((error) => {
+            backfillsStarted.delete(userPath);
+            console.error("Error backfilling mood rollups:", error);
+        });
+    }, [db, userPath, summary]);
+
+    const rows = useMemo(() => {
+        const byId = new Map(buckets.entries.map(entry => [entry.id, entry]));
+        return recentBuckets(range, count).map(bucket => ({ bucket, counts: byId.get(bucket.id)?.counts || {}, total: byId.get(bucket.id)?.total || 0 }));
+    }, [buckets.entries, range, count]);
+    const maxTotal = Math.max(1, ...rows.map(row => row.total));
+
+    const { streak, open } = useMemo(() => moodStreak(months.entries), [months.entries]);
+    useEffect(() => {
+        if (open && months.hasMore) months.loadMore();
+    }, [open, months]);
+
+    return (
+        <div className="mt-8 bg-gray-50 dark:bg-gray-700 p-4 rounded-lg shadow-sm">
+            <div className="flex justify-between items-center mb-3">
+                <h3 className="text-xl font-semibold text-gray-900 dark:text-gray-100">Trends</h3>
+                <div className="flex gap-2">
+                    {Object.entries(TREND_RANGES).map(([key, option]) => (
+                        <button
+                            key={key}
+                            onClick={() => setRange(key)}
+                            className={`py-1 px-3 rounded-full text-xs font-medium transition-all duration-200 ${range === key ? 'bg-purple-500 text-white' : 'bg-gray-200 dark:bg-gray-600 text-gray-700 dark:text-gray-300'}`}
+                        >
+                            {option.title}
+                        </button>
+                    ))}
+                </div>
+            </div>
+            <p className="text-sm text-gray-600 dark:text-gray-300 mb-3">
+                {streak > 0 ? `Current streak: ${streak} day${streak === 1 ? '' : 's'} in a row` : 'Log a mood today to start a streak.'}
+                {summary?.total > 0 && ` · ${summary.total} moods logged in total`}
+            </p>
+            <div className="space-y-2">
+                {rows.map(({ bucket, counts, total }) => (
+                    <div key={bucket.id} className="flex items-center gap-3 text-xs">
+                        <span className="w-16 shrink-0 text-gray-600 dark:text-gray-300">{label(bucket)}</span>
+                        <div className="flex-1 flex h-3 rounded overflow-hidden bg-gray-200 dark:bg-gray-600">
+                            <div className="flex h-full" style={{ width: `${(total / maxTotal) * 100}%` }}>
+                                {MOODS.filter(m => counts[m] > 0).map(m => (
+                                    <div key={m} className={MOOD_COLORS[m]} style={{ width: `${(counts[m] / total) * 100}%` }} title={`${m}: ${counts[m]}`}></div>
+                                ))}
+                            </div>
+                        </div>
+                        <span className="w-6 text-right text-gray-600 dark:text-gray-300">{total}</span>
+                    </div>
+                ))}
+            </div>
+            <div className="flex flex-wrap gap-3 mt-3 text-xs text-gray-600 dark:text-gray-300">
+                {MOODS.map(m => (
+                    <span key={m} className="flex items-center gap-1">
+                        <span className={`inline-block w-2 h-2 rounded-full ${MOOD_COLORS[m]}`}></span>{m}
+                    </span>
+                ))}
+            </div>
+        </div>
+    );
+};
+
+const MoodTab = () => {
+    useCommitCount('tab:mood');
+    const db = useStore(appStore, s => s.db);
+    const userId = useStore(appStore, s => s.userId);
     const [mood, setMood] = useState('');
-    const [journalEntry, setJournalEntry] = useState('');
-    const [chatInput, setChatInput] = useState('');
-    const [chatHistory, setChatHistory] = useState([]);
-    const [moodEntries, setMoodEntries] = useState([]);
-    const [journalEntries, setJournalEntries] = useState([]);
-    const [loadingChat, setLoadingChat] = useState(false);
-    const [loadingData, setLoadingData] = useState(true);
-    const [userId, setUserId] = useState(null);
-    const [firebaseDb, setFirebaseDb] = useState(null);
-    const [firebaseAuth, setFirebaseAuth] = useState(null);
-    const chatContainerRef = useRef(null);
-    const [showConfirmation, setShowConfirmation] = useState(false);
     const [entryToDelete, setEntryToDelete] = useState(null);
-    const [deleteType, setDeleteType] = useState(''); // 'mood' or 'journal'
+    const [selection, setSelection, toggleSelected] = useSelection();
+    const userPath = userPathFor(userId);
+    const moods = useMoodLog(db, userPath);
+
+    // Handle mood submission
+    // Writes are not awaited: they reach the local cache (and the list) at once and are queued
+    // until the server is reachable, so logging works the same offline.
+    const handleMoodSubmit = () => {
+        if (!mood || !db || !userId) return;
+
+        logMood(db, userId, mood).catch((e) => {
+            console.error("Error adding mood entry: ", e);
+        });
+        setMood('');
+    };
+
+    const handleDelete = () => {
+        if (!entryToDelete || !db || !userId) return;
+        deleteMoods(db, userPath, [entryToDelete]).then(() => {
+            console.log("mood entry deleted successfully!");
+        }).catch((e) => {
+            console.error("Error deleting mood entry: ", e);
+        });
+        moods.removeEntries([entryToDelete.id]);
+        setEntryToDelete(null);
+    };
+
+    const handleBulkDelete = (request) => bulkDeleteMoods(db, userPath, moods, request);
+
+    const renderRow = useCallback(entry => (
+        <MoodRow
+            entry={entry}
+            onDelete={setEntryToDelete}
+            selected={selection ? selection.has(entry.id) : false}
+            onToggleSelect={selection ? toggleSelected : undefined}
+        />
+    ), [selection, toggleSelected]);
+
+    return (
+        <div className="space-y-6">
+            <h2 className="text-2xl font-semibold text-gray-900 dark:text-gray-100 mb-4">How are you feeling today?</h2>
+            <div className="flex flex-wrap gap-3 mb-4">
+                {MOODS.map(m => (
+                    <button
+                        key={m}
+                        onClick={() => setMood(m)}
+                        className={`py-2 px-4 rounded-full text-sm font-medium transition-all duration-200
+                            ${mood === m ? 'bg-purple-500 text-white shadow-lg scale-105' : 'bg-gray-200 dark:bg-gray-700 text-gray-700 dark:text-gray-300 hover:bg-purple-100 dark:hover:bg-purple-900'}`}
+                    >
+                        {m}
+                    </button>
+                ))}
+            </div>
+            <button
+                onClick={handleMoodSubmit}
+                disabled={!mood}
+                className="w-full bg-indigo-600 hover:bg-indigo-700 text-white font-bold py-3 px-6 rounded-lg shadow-md transition-all duration-300 disabled:opacity-50 disabled:cursor-not-allowed"
+            >
+                Log Mood
+            </button>
 
-    // Firebase initialization and authentication
-    useEffect(() => {
-        const appId = typeof __app_id !== 'undefined' ? __app_id : 'default-app-id';
-        const firebaseConfig = typeof __firebase_config !== 'undefined' ? JSON.parse(__firebase_config) : {};
+            <MoodTrends />
 
-        try {
-            const app = initializeApp(firebaseConfig);
-            const db = getFirestore(app);
-            const auth = getAuth(app);
-            setFirebaseDb(db);
-            setFirebaseAuth(auth);
-
-            const unsubscribe = onAuthStateChanged(auth, async (user) => {
-                if (user) {
-                    setUserId(user.uid);
-                } else {
-                    // Sign in anonymously if no user is logged in
-                    try {
-                        if (typeof __initial_auth_token !== 'undefined') {
-                            await signInWithCustomToken(auth, __initial_auth_token);
-                        } else {
-                            await signInAnonymously(auth);
-                        }
-                    } catch (error) {
-                        console.error("Error signing in:", error);
-                    }
-                }
-                setLoadingData(false);
-            });
+            <div className="mt-8">
+                <h3 className="text-xl font-semibold text-gray-900 dark:text-gray-100 mb-3">Your Mood History</h3>
+                {moods.entries.length > 0 && (
+                    <BulkDeleteBar noun="mood entries" selection={selection} onSelectionChange={setSelection} onDelete={handleBulkDelete} />
+                )}
+                {moods.entries.length === 0 ? (
+                    <p className="text-gray-600 dark:text-gray-400">No mood entries yet. Log your first mood!</p>
+                ) : (
+                    <VirtualList
+                        items={moods.entries}
+                        getKey={entryKey}
+                        className="max-h-[32rem] overflow-y-auto"
+                        rowClassName="pb-3"
+                        onEndReached={moods.loadMore}
+                        footer={moods.loadingMore && <LoadingMore />}
+                        renderItem={renderRow}
+                    />
+                )}
+            </div>
 
-            return () => unsubscribe();
-        } catch (error) {
-            console.error("Error initializing Firebase:", error);
-            setLoadingData(false);
-        }
-    }, []);
+            {entryToDelete && (
+                <ConfirmDeleteModal type="mood" onCancel={() => setEntryToDelete(null)} onConfirm={handleDelete} />
+            )}
+        </div>
+    );
+};
 
-    // Fetch data from Firestore
-    useEffect(() => {
-        if (firebaseDb && userId) {
-            // Listen for mood entries
-            const moodQuery = query(collection(firebaseDb, `artifacts/${__app_id}/users/${userId}/moodEntries`));
-            const unsubscribeMood = onSnapshot(moodQuery, (snapshot) => {
-                const entries = snapshot.docs.map(doc => ({ id: doc.id, ...doc.data() }));
-                // Sort mood entries by timestamp in descending order
-                entries.sort((a, b) => (b.timestamp?.toDate() || 0) - (a.timestamp?.toDate() || 0));
-                setMoodEntries(entries);
-            }, (error) => {
-                console.error("Error fetching mood entries:", error);
-            });
+// The textarea keeps its own state, so typing re-renders only this component
+const JournalComposer = () => {
+    useCommitCount('JournalComposer');
+    const db = useStore(appStore, s => s.db);
+    const userId = useStore(appStore, s => s.userId);
+    const [journalEntry, setJournalEntry] = useState('');
 
-            // Listen for journal entries
-            const journalQuery = query(collection(firebaseDb, `artifacts/${__app_id}/users/${userId}/journalEntries`));
-            const unsubscribeJournal = onSnapshot(journalQuery, (snapshot) => {
-                const entries = snapshot.docs.map(doc => ({ id: doc.id, ...doc.data() }));
-                // Sort journal entries by timestamp in descending order
-                entries.sort((a, b) => (b.timestamp?.toDate() || 0) - (a.timestamp?.toDate() || 0));
-                setJournalEntries(entries);
-            }, (error) => {
-                console.error("Error fetching journal entries:", error);
-            });
+    // Handle journal submission
+    const handleJournalSubmit = () => {
+        if (!journalEntry.trim() || !db || !userId) return;
 
-            // Listen for chat history
-            const chatQuery = query(collection(firebaseDb, `artifacts/${__app_id}/users/${userId}/chatHistory`));
-            const unsubscribeChat = onSnapshot(chatQuery, (snapshot) => {
-                const history = snapshot.docs.map(doc => ({ id: doc.id, ...doc.data() }));
-                // Sort chat history by timestamp in ascending order
-                history.sort((a, b) => (a.timestamp?.toDate() || 0) - (b.timestamp?.toDate() || 0));
-                setChatHistory(history);
-            }, (error) => {
-                console.error("Error fetching chat history:", error);
-            });
+        addDoc(collection(db, `${userPathFor(userId)}/journalEntries`), {
+            content: journalEntry,
+            timestamp: serverTimestamp(),
+            userId: userId,
+        }).catch((e) => {
+            console.error("Error adding journal entry: ", e);
+        });
+        setJournalEntry('');
+    };
 
-            return () => {
-                unsubscribeMood();
-                unsubscribeJournal();
-                unsubscribeChat();
-            };
-        }
-    }, [firebaseDb, userId]);
+    return (
+        <div className="space-y-6">
+            <textarea
+                className="w-full p-4 border border-gray-300 dark:border-gray-600 rounded-lg focus:ring-indigo-500 focus:border-indigo-500 bg-white dark:bg-gray-700 text-gray-900 dark:text-gray-100 placeholder-gray-400 dark:placeholder-gray-500 min-h-[150px]"
+                placeholder="What's on your mind today?"
+                data-benchmark="journal-input"
+                value={journalEntry}
+                onChange={(e) => setJournalEntry(e.target.value)}
+            ></textarea>
+            <button
+                onClick={handleJournalSubmit}
+                disabled={!journalEntry.trim()}
+                className="w-full bg-indigo-600 hover:bg-indigo-700 text-white font-bold py-3 px-6 rounded-lg shadow-md transition-all duration-300 disabled:opacity-50 disabled:cursor-not-allowed"
+            >
+                Save Journal Entry
+            </button>
+        </div>
+    );
+};
+
+// End of the local calendar day given as "YYYY-MM-DD", in millis
+const endOfDayMillis = (key) => {
+    const date = parseDayKey(key);
+    date.setDate(date.getDate() + 1);
+    return date.getTime() - 1;
+};
+
+// Search box over the journal. Shows matching entries while a query or date range is set, and
+// `children` otherwise. Responses to superseded queries are dropped.
+const JournalSearch = ({ search, renderRow, children }) => {
+    const [text, setText] = useState('');
+    const [from, setFrom] = useState('');
+    const [to, setTo] = useState('');
+    const [found, setFound] = useState(null);
+    const latestQueryRef = useRef(0);
+    const active = text.trim() !== '' || from !== '' || to !== '';
+    // Queries run again after the index changes, so deleted and new entries show up in the results
+    const indexVersion = useSyncExternalStore(search.subscribe, search.getVersion);
 
-    // Scroll to bottom of chat
     useEffect(() => {
-        if (chatContainerRef.current) {
-            chatContainerRef.current.scrollTop = chatContainerRef.current.scrollHeight;
+        const queryId = ++latestQueryRef.current;
+        if (!active) {
+            setFound(null);
+            return;
         }
-    }, [chatHistory]);
+        search.find({
+            text,
+            from: from ? parseDayKey(from).getTime() : null,
+            to: to ? endOfDayMillis(to) : null,
+        }).then(result => {
+            if (queryId !== latestQueryRef.current) return;
+            setFound(result);
+        });
+    }, [search, active, text, from, to, indexVersion]);
 
-    // Handle mood submission
-    const handleMoodSubmit = async () => {
-        if (!mood || !firebaseDb || !userId) return;
+    const inputClassName = 'p-2 border border-gray-300 dark:border-gray-600 rounded-lg bg-white dark:bg-gray-700 text-gray-900 dark:text-gray-100 focus:outline-none focus:ring-2 focus:ring-blue-500';
 
-        try {
-            await addDoc(collection(firebaseDb, `artifacts/${__app_id}/users/${userId}/moodEntries`), {
-                mood: mood,
-                timestamp: serverTimestamp(),
-                userId: userId,
-            });
-            setMood('');
-        } catch (e) {
-            console.error("Error adding mood entry: ", e);
-        }
-    };
+    return (
+        <div className="space-y-3">
+            <div className="flex flex-wrap gap-2">
+                <input
+                    type="search"
+                    className={`${inputClassName} flex-1 min-w-[12rem]`}
+                    placeholder="Search your journal..."
+                    value={text}
+                    onChange={(e) => setText(e.target.value)}
+                />
+                <input type="date" className={inputClassName} value={from} max={to || undefined} onChange={(e) => setFrom(e.target.value)} title="From" />
+                <input type="date" className={inputClassName} value={to} min={from || undefined} onChange={(e) => setTo(e.target.value)} title="To" />
+            </div>
+            {!active ? children : !found ? (
+                <p className="text-gray-600 dark:text-gray-400">Searching...</p>
+            ) : (
+                <div className="space-y-3">
+                    <p className="text-sm text-gray-500 dark:text-gray-400">
+                        {found.total === 1 ? '1 match' : `${found.total} matches`}
+                        {found.total > found.results.length && `, showing the newest ${found.results.length}`}
+                    </p>
+                    {found.results.length > 0 && (
+                        <VirtualList
+                            items={found.results}
+                            getKey={entryKey}
+                            className="max-h-[40rem] overflow-y-auto"
+                            rowClassName="pb-3"
+                            estimatedRowHeight={110}
+                            renderItem={renderRow}
+                        />
+                    )}
+                </div>
+            )}
+        </div>
+    );
+};
 
-    // Handle journal submission
-    const handleJournalSubmit = async () => {
-        if (!journalEntry.trim() || !firebaseDb || !userId) return;
+const JournalTab = () => {
+    useCommitCount('tab:journal');
+    const db = useStore(appStore, s => s.db);
+    const userId = useStore(appStore, s => s.userId);
+    const [entryToDelete, setEntryToDelete] = useState(null);
+    const journalPath = userId ? `${userPathFor(userId)}/journalEntries` : null;
+    const [selection, setSelection, toggleSelected] = useSelection();
+    const pages = usePagedCollection(db, journalPath, JOURNAL_OPTIONS);
+    const search = journalPath ? getJournalSearch(journalPath) : null;
 
-        try {
-            await addDoc(collection(firebaseDb, `artifacts/${__app_id}/users/${userId}/journalEntries`), {
-                content: journalEntry,
-                timestamp: serverTimestamp(),
-                userId: userId,
-            });
-            setJournalEntry('');
-        } catch (e) {
-            console.error("Error adding journal entry: ", e);
-        }
+    const handleDelete = () => {
+        if (!entryToDelete || !db || !userId) return;
+        deleteEntry(db, pages, journalPath, entryToDelete, 'journal');
+        setEntryToDelete(null);
     };
 
-    // Handle chat message submission
-    const handleChatSubmit = async (e) => {
-        e.preventDefault();
-        if (!chatInput.trim() || loadingChat || !firebaseDb || !userId) return;
+    const handleBulkDelete = (request) => bulkDeleteEntries(db, pages, journalPath, request);
+
+    const renderRow = useCallback(entry => (
+        <JournalRow
+            entry={entry}
+            onDelete={setEntryToDelete}
+            selected={selection ? selection.has(entry.id) : false}
+            onToggleSelect={selection ? toggleSelected : undefined}
+        />
+    ), [selection, toggleSelected]);
+
+    const entryList = pages.entries.length === 0 ? (
+        <p className="text-gray-600 dark:text-gray-400">No journal entries yet. Start writing!</p>
+    ) : (
+        <VirtualList
+            items={pages.entries}
+            getKey={entryKey}
+            className="max-h-[40rem] overflow-y-auto"
+            rowClassName="pb-3"
+            estimatedRowHeight={110}
+            onEndReached={pages.loadMore}
+            footer={pages.loadingMore && <LoadingMore />}
+            renderItem={renderRow}
+        />
+    );
+
+    return (
+        <div className="space-y-6">
+            <h2 className="text-2xl font-semibold text-gray-900 dark:text-gray-100 mb-4">Write your thoughts</h2>
+            <Profiled id="JournalComposer">
+                <JournalComposer />
+            </Profiled>
+
+            <div className="mt-8">
+                <h3 className="text-xl font-semibold text-gray-900 dark:text-gray-100 mb-3">Your Journal Entries</h3>
+                {pages.entries.length > 0 && (
+                    <BulkDeleteBar noun="journal entries" selection={selection} onSelectionChange={setSelection} onDelete={handleBulkDelete} />
+                )}
+                {search ? (
+                    <JournalSearch search={search} renderRow={renderRow}>{entryList}</JournalSearch>
+                ) : entryList}
+            </div>
+
+            {entryToDelete && (
+                <ConfirmDeleteModal type="journal" onCancel={() => setEntryToDelete(null)} onConfirm={handleDelete} />
+            )}
+        </div>
+    );
+};
+
+// In-progress reply: the streamed text so far, or a spinner until the first chunk arrives
+const ChatStatus = () => {
+    const loadingChat = useStore(appStore, s => s.loadingChat);
+    const streamingText = useStore(appStore, s => s.streamingText);
+    if (!loadingChat) return null;
+
+    return (
+        <div className="flex justify-start">
+            <div className="max-w-[70%] p-3 rounded-lg shadow-sm bg-gray-200 dark:bg-gray-600 text-gray-900 dark:text-gray-100 rounded-bl-none">
+                {streamingText ? (
+                    <p className="text-sm">{streamingText}</p>
+                ) : (
+                    <div className="flex items-center">
+                        <div className="animate-spin rounded-full h-4 w-4 border-b-2 border-gray-900 dark:border-gray-100 mr-2"></div>
+                        <span>Thinking...</span>
+                    </div>
+                )}
+            </div>
+        </div>
+    );
+};
+
+// The input keeps its own state, so typing re-renders only this component
+const ChatComposer = ({ onSend, onStop }) => {
+    useCommitCount('ChatComposer');
+    const loadingChat = useStore(appStore, s => s.loadingChat);
+    const [chatInput, setChatInput] = useState('');
 
-        const userMessage = { role: 'user', text: chatInput, timestamp: serverTimestamp() };
-        setChatHistory(prev => [...prev, userMessage]);
-        await addDoc(collection(firebaseDb, `artifacts/${__app_id}/users/${userId}/chatHistory`), userMessage);
+    const handleChatSubmit = (e) => {
+        e.preventDefault();
+        if (!chatInput.trim() || loadingChat) return;
+        onSend(chatInput);
         setChatInput('');
-        setLoadingChat(true);
+    };
 
-        try {
-            const prompt = chatInput;
-            let currentChatHistory = [...chatHistory, userMessage].map(msg => ({
-                role: msg.role,
-                parts: [{ text: msg.text }]
-            }));
+    return (
+        <form onSubmit={handleChatSubmit} className="p-4 border-t border-gray-200 dark:border-gray-600 flex items-center">
+            <input
+                type="text"
+                className="flex-1 p-3 border border-gray-300 dark:border-gray-600 rounded-l-lg focus:ring-indigo-500 focus:border-indigo-500 bg-white dark:bg-gray-800 text-gray-900 dark:text-gray-100 placeholder-gray-400 dark:placeholder-gray-500"
+                placeholder="Type your message..."
+                data-benchmark="chat-input"
+                value={chatInput}
+                onChange={(e) => setChatInput(e.target.value)}
+                disabled={loadingChat}
+            />
+            {loadingChat ? (
+                <button
+                    type="button"
+                    onClick={onStop}
+                    className="bg-gray-500 hover:bg-gray-600 text-white font-bold py-3 px-5 rounded-r-lg shadow-md transition-all duration-300"
+                    title="Stop"
+                >
+                    Stop
+                </button>
+            ) : (
+                <button
+                    type="submit"
+                    className="bg-indigo-600 hover:bg-indigo-700 text-white font-bold py-3 px-5 rounded-r-lg shadow-md transition-all duration-300 disabled:opacity-50 disabled:cursor-not-allowed"
+                    disabled={!chatInput.trim()}
+                >
+                    <Icon name="paper-plane" />
+                </button>
+            )}
+        </form>
+    );
+};
 
-            const payload = { contents: currentChatHistory };
-            const apiKey = ""; // Canvas will provide this
-            const apiUrl = `https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key=${apiKey}`;
+const chatStatus = <ChatStatus />;
 
-            const response = await fetch(apiUrl, {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify(payload)
-            });
+const ChatTab = () => {
+    useCommitCount('tab:chat');
+    const db = useStore(appStore, s => s.db);
+    const userId = useStore(appStore, s => s.userId);
+    const loadingChat = useStore(appStore, s => s.loadingChat);
+    const reuseAiAnswers = useStore(appStore, s => s.reuseAiAnswers);
+    const chat = useChat(db, userId);
+    const renderChatBubble = useCallback(msg => <ChatBubble msg={msg} onRetry={chat.retryMessage} />, [chat.retryMessage]);
 
-            const result = await response.json();
-            if (result.candidates && result.candidates.length > 0 &&
-                result.candidates[0].content && result.candidates[0].content.parts &&
-                result.candidates[0].content.parts.length > 0) {
-                const aiResponseText = result.candidates[0].content.parts[0].text;
-                const aiMessage = { role: 'model', text: aiResponseText, timestamp: serverTimestamp() };
-                setChatHistory(prev => [...prev, aiMessage]);
-                await addDoc(collection(firebaseDb, `artifacts/${__app_id}/users/${userId}/chatHistory`), aiMessage);
-            } else {
-                const errorMessage = "Sorry, I couldn't generate a response. Please try again.";
-                const aiMessage = { role: 'model', text: errorMessage, timestamp: serverTimestamp() };
-                setChatHistory(prev => [...prev, aiMessage]);
-                await addDoc(collection(firebaseDb, `artifacts/${__app_id}/users/${userId}/chatHistory`), aiMessage);
-                console.error("Unexpected API response structure:", result);
-            }
+    return (
+        <div className="flex flex-col h-[500px] bg-gray-50 dark:bg-gray-700 rounded-lg shadow-md">
+            <div className="flex flex-wrap items-center justify-between gap-2 px-4 pt-3 text-xs text-gray-600 dark:text-gray-400">
+                <label className="flex items-center gap-2 mb-3" title="Older messages are moved to an archive">
+                    Keep chat history:
+                    <select
+                        className="p-1 border border-gray-300 dark:border-gray-600 rounded bg-white dark:bg-gray-700 text-gray-900 dark:text-gray-100"
+                        value={chat.retentionDays || ''}
+                        onChange={(e) => chat.setRetentionDays(e.target.value ? Number(e.target.value) : null)}
+                    >
+                        {CHAT_RETENTION_OPTIONS.map(option => (
+                            <option key={option.label} value={option.days || ''}>{option.label}</option>
+                        ))}
+                    </select>
+                </label>
+                <BulkDeleteBar noun="chat messages" ranged={false} onDelete={chat.deleteAll} />
+            </div>
+            {chat.chatHistory.length === 0 && !loadingChat ? (
+                <div className="flex-1 p-4 text-center text-gray-500 dark:text-gray-400 mt-10">
+                    Start a conversation with your AI companion!
+                </div>
+            ) : (
+                <VirtualList
+                    items={chat.chatHistory}
+                    getKey={entryKey}
+                    className="flex-1 p-4 overflow-y-auto"
+                    rowClassName="pb-4"
+                    estimatedRowHeight={64}
+                    stickToBottom
+                    onStartReached={chat.loadMore}
+                    renderItem={renderChatBubble}
+                    footer={chatStatus}
+                />
+            )}
+            <label className="flex items-center gap-2 px-4 pt-2 text-xs text-gray-500 dark:text-gray-400">
+                <input type="checkbox" checked={reuseAiAnswers} onChange={(e) => setReuseAiAnswers(e.target.checked)} />
+                Reuse earlier answers to repeated questions
+            </label>
+            <Profiled id="ChatComposer">
+                <ChatComposer onSend={chat.sendMessage} onStop={stopChatReply} />
+            </Profiled>
+        </div>
+    );
+};
+
+// Counts the commits of a component in instrumented sessions (`perf` is fixed for the session, so
+// the hook is either always or never called)
+const useCommitCount = perf ? (id) => useLayoutEffect(() => perf.recordCommit(id)) : () => {};
+
+// Times its subtree with React.Profiler in instrumented sessions and renders it unchanged otherwise.
+// The components inside count their own commits with useCommitCount, which production builds support.
+const Profiled = ({ id, children }) => (
+    perf ? <React.Profiler id={id} onRender={perf.recordRender}>{children}</React.Profiler> : children
+);
+
+// Benchmark scenario settings; __benchmark overrides any of them. `seed` is { moods, journal,
+// chat, days } or null to use existing data; `reportUrl` receives the results as a JSON POST.
+const BENCHMARK_DEFAULTS = { seed: null, keystrokes: 50, chatMessages: 3, settleMs: 1000, reportUrl: null };
+
+const BENCHMARK_WORDS = ['today', 'felt', 'calm', 'walk', 'work', 'stress', 'sleep', 'friend', 'coffee', 'breathing',
+    'grateful', 'tired', 'anxious', 'family', 'run', 'rain', 'music', 'read', 'meeting', 'dinner'];
+
+// Deterministic pseudo-random numbers (mulberry32), so seeded data is identical between runs
+const seededRandom = (seed) => () => {
+    seed = (seed + 0x6D2B79F5) | 0;
+    let t = Math.imul(seed ^ (seed >>> 15), 1 | seed);
+    t = (t + Math.imul(t ^ (t >>> 7), 61 | t)) ^ t;
+    return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+};
+
+// Months of mood events per seeding batch, keeping requests well under Firestore's size limit
+const SEED_MONTHS_PER_BATCH = 12;
+// Seeded data ends here rather than at the current time, so seeding again rewrites the same
+// documents and month events (arrayUnion skips identical ones) instead of adding copies
+const SEED_EPOCH_MILLIS = Date.UTC(2025, 0, 1);
+
+// Seed the user's collections with synthetic moods, journal entries and chat messages spread
+// evenly over the `days` before SEED_EPOCH_MILLIS (by default long enough that month documents
+// stay small). Refuses to run unless Firestore is connected to the emulator.
+const seedBenchmarkData = async (db, userPath, { moods = 0, journal = 0, chat = 0, days } = {}) => {
+    if (typeof __firestore_emulator_host === 'undefined') throw new Error('Benchmark data is only seeded into the Firestore emulator');
+    const random = seededRandom(42);
+    const spanMs = (days || Math.max(365, Math.ceil(moods / 20))) * 24 * 60 * 60 * 1000;
+    const timestampAt = (i, count) => Timestamp.fromMillis(SEED_EPOCH_MILLIS - Math.floor(((count - i) / count) * spanMs));
+    const pick = (items) => items[Math.floor(random() * items.length)];
+    const sentence = (words) => Array.from({ length: words }, () => pick(BENCHMARK_WORDS)).join(' ');
+
+    const events = Array.from({ length: moods }, (_, i) => {
+        const timestamp = timestampAt(i, moods);
+        return { id: `bench-mood-${i}`, mood: pick(MOODS), timestamp, day: dayKeyFor(timestamp.toDate()) };
+    });
+    const months = groupByMonth(events);
+    for (let i = 0; i < months.length; i += SEED_MONTHS_PER_BATCH) {
+        const batch = writeBatch(db);
+        months.slice(i, i + SEED_MONTHS_PER_BATCH).forEach(({ month, events: monthEvents }) => appendMoodEvents(batch, db, userPath, month, monthEvents));
+        await batch.commit();
+    }
+    await backfillMoodRollups(db, userPath);
+
+    await commitInChunks(db, Array.from({ length: journal }, (_, i) => ({
+        path: `${userPath}/journalEntries/bench-journal-${i}`,
+        data: { content: sentence(20 + Math.floor(random() * 80)), timestamp: timestampAt(i, journal) },
+    })));
+    await commitInChunks(db, Array.from({ length: chat }, (_, i) => ({
+        path: `${userPath}/chatHistory/bench-chat-${String(i).padStart(7, '0')}`,
+        data: { role: i % 2 ? 'model' : 'user', text: sentence(10 + Math.floor(random() * 40)), timestamp: timestampAt(i, chat) },
+    })));
+};
+
+const nextFrame = () => new Promise(resolve => requestAnimationFrame(() => resolve()));
+const delay = (ms) => new Promise(resolve => setTimeout(resolve, ms));
+
+// Check `condition` every frame and resolve with its first truthy result
+const waitFor = async (condition, description, timeoutMs = 120000) => {
+    const deadline = performance.now() + timeoutMs;
+    let result;
+    while (!(result = condition())) {
+        if (performance.now() > deadline) throw new Error(`Benchmark timed out waiting for ${description}`);
+        await nextFrame();
+    }
+    return result;
+};
+
+// Type into a React-controlled field the way the browser would: native value setter, then an input event
+const typeInto = (element, value) => {
+    Object.getOwnPropertyDescriptor(Object.getPrototypeOf(element), 'value').set.call(element, value);
+    element.dispatchEvent(new Event('input', { bubbles: true }));
+};
+
+const copyRenders = () => JSON.parse(JSON.stringify({ commits: perf.metrics.commits, renders: perf.metrics.renders }));
+
+// Commits per profiled component and render time per subtree since `before`, divided by `count`.
+// renderMs is null without a profiling build of React.
+const rendersPer = (before, count) => Object.fromEntries(Object.entries(perf.metrics.commits).map(([id, commits]) => {
+    const stats = perf.metrics.renders[id];
+    const prior = before.renders[id] || { totalMs: 0 };
+    return [id, { commits: (commits - (before.commits[id] || 0)) / count, renderMs: stats ? (stats.totalMs - prior.totalMs) / count : null }];
+}));
+
+// The benchmark scenario: optionally seed data, open each tab, type into the journal, send chat
+// messages, then report. Results are exposed as window.__benchmarkResults, logged on one
+// "BENCHMARK_RESULTS {...}" console line and POSTed to reportUrl if set.
+const runBenchmark = async (db, userId) => {
+    const config = { ...BENCHMARK_DEFAULTS, ...BENCHMARK_CONFIG };
+    const userPath = userPathFor(userId);
+    const results = { config, startedAt: new Date().toISOString(), userAgent: navigator.userAgent };
+
+    if (config.seed) {
+        const started = performance.now();
+        await seedBenchmarkData(db, userPath, config.seed);
+        results.seedMs = performance.now() - started;
+    }
+
+    // Opening each tab: time to the next painted frame, then let its snapshots settle
+    results.tabs = {};
+    for (const tab of TABS.map(({ id }) => id)) {
+        const started = performance.now();
+        appStore.setState({ activeTab: tab });
+        await nextFrame();
+        await nextFrame();
+        results.tabs[tab] = { openMs: performance.now() - started };
+        await delay(config.settleMs);
+    }
+
+    appStore.setState({ activeTab: 'journal' });
+    const journalInput = await waitFor(() => document.querySelector('[data-benchmark="journal-input"]'), 'the journal input');
+    const beforeTyping = copyRenders();
+    for (let i = 0; i < config.keystrokes; i++) {
+        typeInto(journalInput, journalInput.value + 'benchmark '[i % 10]);
+        await nextFrame();
+    }
+    results.perKeystroke = rendersPer(beforeTyping, config.keystrokes);
+    typeInto(journalInput, '');
+
+    // Every turn asks the model: answers cached by an earlier run would skew the latencies. The
+    // setting is switched off in the store only, so the user's saved preference is untouched.
+    appStore.setState({ activeTab: 'chat', reuseAiAnswers: false });
+    const chatInput = await waitFor(() => document.querySelector('[data-benchmark="chat-input"]'), 'the chat input');
+    const turnsBefore = perf.metrics.chatTurns.length;
+    for (let i = 0; i < config.chatMessages; i++) {
+        typeInto(chatInput, `Benchmark question ${i + 1}: what helps when I feel ${BENCHMARK_WORDS[i % BENCHMARK_WORDS.length]}?`);
+        await nextFrame();
+        chatInput.form.requestSubmit();
+        await waitFor(() => perf.metrics.chatTurns.length > turnsBefore + i, 'a chat reply');
+    }
+    appStore.setState({ reuseAiAnswers: readLocal('reuseAiAnswers') !== false });
+
+    if (performance.memory) {
+        results.memory = { usedJSHeapSize: performance.memory.usedJSHeapSize, totalJSHeapSize: performance.memory.totalJSHeapSize };
+    }
+    if (typeof crossOriginIsolated !== 'undefined' && crossOriginIsolated && performance.measureUserAgentSpecificMemory) {
+        results.memory = { ...results.memory, userAgentSpecificBytes: (await performance.measureUserAgentSpecificMemory()).bytes };
+    }
+    results.metrics = perf.metrics;
+    results.finishedAt = new Date().toISOString();
+
+    window.__benchmarkResults = results;
+    console.log(`BENCHMARK_RESULTS ${JSON.stringify(results)}`);
+    if (config.reportUrl) {
+        await fetch(config.reportUrl, { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify(results) });
+    }
+    return results;
+};
+
+// Start the benchmark once Firestore is ready and the user is signed in
+const startBenchmarkWhenReady = () => {
+    const unsubscribe = appStore.subscribe(() => {
+        const { db, auth, userId } = appStore.getState();
+        if (!db || !auth || !auth.currentUser || auth.currentUser.uid !== userId) return;
+        unsubscribe();
+        runBenchmark(db, userId).catch(error => {
+            console.error("Benchmark failed:", error);
+        });
+    });
+};
+
+if (BENCHMARK_CONFIG) startBenchmarkWhenReady();
+
+const Header = () => {
+    useCommitCount('Header');
+    const userId = useStore(appStore, s => s.userId);
+    return (
+        <div className="p-6 bg-gradient-to-r from-purple-600 to-indigo-700 text-white text-center rounded-t-xl">
+            <h1 className="text-3xl sm:text-4xl font-bold mb-2">My Well-being Hub</h1>
+            <p className="text-lg sm:text-xl opacity-90">Track your mood, journal, and chat with AI.</p>
+            {userId && (
+                <p className="text-sm mt-2 opacity-80">User ID: {userId}</p>
+            )}
+        </div>
+    );
+};
+
+const OfflineBanner = () => {
+    const online = useStore(appStore, s => s.online);
+    if (online) return null;
+    return (
+        <div className="px-6 py-2 bg-yellow-100 dark:bg-yellow-900 text-yellow-800 dark:text-yellow-200 text-sm text-center">
+            You're offline. New entries are saved on this device and will sync when you reconnect.
+        </div>
+    );
+};
+
+const TABS = [
+    { id: 'mood', icon: 'smile', label: 'Mood Tracker' },
+    { id: 'journal', icon: 'book-open', label: 'Journal' },
+    { id: 'chat', icon: 'robot', label: 'AI Chatbot' },
+];
+
+const TabBar = () => {
+    useCommitCount('TabBar');
+    const activeTab = useStore(appStore, s => s.activeTab);
+    return (
+        <div className="flex justify-around bg-gray-100 dark:bg-gray-700 p-3 border-b border-gray-200 dark:border-gray-600">
+            {TABS.map(tab => (
+                <button
+                    key={tab.id}
+                    onClick={() => appStore.setState({ activeTab: tab.id })}
+                    className={`py-2 px-4 rounded-lg font-medium transition-all duration-300 ${activeTab === tab.id ? 'bg-purple-500 text-white shadow-md' : 'text-gray-700 dark:text-gray-300 hover:bg-gray-200 dark:hover:bg-gray-600'}`}
+                >
+                    <Icon name={tab.icon} className="mr-2" />{tab.label}
+                </button>
+            ))}
+        </div>
+    );
+};
+
+// Export and import of the user's entries, with progress
+const DataPanel = () => {
+    useCommitCount('DataPanel');
+    const db = useStore(appStore, s => s.db);
+    const userId = useStore(appStore, s => s.userId);
+    const transfer = useStore(appStore, s => s.transfer);
+    const fileInputRef = useRef(null);
+    const userPath = userPathFor(userId);
+    const running = transfer?.running;
+    const canResumeExport = !running && userPath && readLocal(`export:${userPath}`);
+
+    const runTransfer = async (kind, run) => {
+        if (!db || !userPath || appStore.getState().transfer?.running) return;
+        reportTransfer({ kind, label: kind === 'export' ? 'Exporting...' : 'Importing...', fraction: 0, running: true });
+        try {
+            const count = await run();
+            reportTransfer({ kind, label: `${kind === 'export' ? 'Exported' : 'Imported'} ${count} entries`, fraction: 1 });
         } catch (error) {
-            console.error("Error communicating with AI chatbot:", error);
-            const errorMessage = "There was an error connecting to the AI. Please check your network and try again.";
-            const aiMessage = { role: 'model', text: errorMessage, timestamp: serverTimestamp() };
-            setChatHistory(prev => [...prev, aiMessage]);
-            await addDoc(collection(firebaseDb, `artifacts/${__app_id}/users/${userId}/chatHistory`), aiMessage);
-        } finally {
-            setLoadingChat(false);
+            console.error(`Error during ${kind}:`, error);
+            const { transfer: last } = appStore.getState();
+            reportTransfer({ ...last, running: false, error: `The ${kind} was interrupted${kind === 'export' ? '. Resume it to export the rest.' : '. Import the same file again to continue.'}` });
         }
     };
 
-    // Function to show confirmation dialog
-    const confirmDelete = (id, type) => {
-        setEntryToDelete({ id, type });
-        setDeleteType(type);
-        setShowConfirmation(true);
+    const handleImport = (e) => {
+        const file = e.target.files[0];
+        e.target.value = '';
+        if (file) runTransfer('import', () => importUserData(db, userPath, file));
     };
 
-    // Function to handle deletion
-    const handleDelete = async () => {
-        if (!entryToDelete || !firebaseDb || !userId) return;
+    const buttonClassName = 'py-2 px-4 rounded-lg font-medium bg-gray-100 dark:bg-gray-700 hover:bg-gray-200 dark:hover:bg-gray-600 disabled:opacity-50 disabled:cursor-not-allowed';
 
-        const { id, type } = entryToDelete;
-        let collectionPath = '';
-        if (type === 'mood') {
-            collectionPath = `artifacts/${__app_id}/users/${userId}/moodEntries`;
-        } else if (type === 'journal') {
-            collectionPath = `artifacts/${__app_id}/users/${userId}/journalEntries`;
-        }
+    return (
+        <details className="px-6 pb-6">
+            <summary className="cursor-pointer text-sm text-gray-500 dark:text-gray-400">Your data</summary>
+            <div className="mt-3 space-y-3">
+                <div className="flex flex-wrap gap-2">
+                    <button className={buttonClassName} disabled={running || !db} onClick={() => runTransfer('export', () => exportUserData(db, userPath))}>
+                        Export
+                    </button>
+                    {canResumeExport && (
+                        <button className={buttonClassName} disabled={!db} onClick={() => runTransfer('export', () => exportUserData(db, userPath, { resume: true }))}>
+                            Resume export
+                        </button>
+                    )}
+                    <button className={buttonClassName} disabled={running || !db} onClick={() => fileInputRef.current.click()}>
+                        Import
+                    </button>
+                    <input ref={fileInputRef} type="file" accept=".ndjson,application/x-ndjson" className="hidden" onChange={handleImport} />
+                </div>
+                {transfer && (
+                    <div className="text-sm text-gray-600 dark:text-gray-400">
+                        <div className="h-2 bg-gray-200 dark:bg-gray-700 rounded">
+                            <div className="h-2 bg-purple-500 rounded" style={{ width: `${Math.round(transfer.fraction * 100)}%` }}></div>
+                        </div>
+                        <p className="mt-1">{transfer.label}</p>
+                        {transfer.error && <p className="text-red-600 dark:text-red-400">{transfer.error}</p>}
+                    </div>
+                )}
+            </div>
+        </details>
+    );
+};
+
+// How often the developer overlay re-reads the recorded metrics
+const PERF_OVERLAY_REFRESH_MS = 1000;
+
+const formatMs = (ms) => (ms === null || ms === undefined ? '-' : `${ms.toFixed(1)} ms`);
+
+const PerfTable = ({ title, columns, rows }) => (
+    <div>
+        <h4 className="mt-2 font-semibold">{title}</h4>
+        {rows.length === 0 ? <p className="text-gray-400">None yet</p> : (
+            <table className="w-full">
+                <thead>
+                    <tr className="text-gray-400">
+                        {columns.map(column => <th key={column} className="text-left font-normal pr-2">{column}</th>)}
+                    </tr>
+                </thead>
+                <tbody>
+                    {rows.map(([name, ...cells]) => (
+                        <tr key={name}>
+                            <td className="pr-2 truncate max-w-[10rem]">{name}</td>
+                            {cells.map((cell, i) => <td key={i} className="pr-2">{cell}</td>)}
+                        </tr>
+                    ))}
+                </tbody>
+            </table>
+        )}
+    </div>
+);
+
+const READ_OPERATIONS = ['listen', 'get'];
+const WRITE_OPERATIONS = ['set', 'add', 'update', 'delete'];
+const sumOf = (counts, operations) => operations.reduce((sum, operation) => sum + (counts[operation] || 0), 0);
+const timingRows = (group) => Object.entries(group)
+    .sort(([, a], [, b]) => b.totalMs - a.totalMs)
+    .map(([name, stats]) => [name, stats.count, formatMs(stats.totalMs / stats.count), formatMs(stats.maxMs)]);
+
+// Commits per component, with its subtree's render times where the Profiler reported them
+const renderRows = ({ commits, renders }) => Object.entries(commits)
+    .sort(([, a], [, b]) => b - a)
+    .map(([name, count]) => {
+        const stats = renders[name];
+        return [name, count, stats ? formatMs(stats.totalMs / stats.count) : '-', stats ? formatMs(stats.maxMs) : '-'];
+    });
+
+// Developer overlay with the live session metrics, shown with ?perf in the URL
+const PerfOverlay = () => {
+    const [, setRefreshes] = useState(0);
+
+    useEffect(() => {
+        const timer = setInterval(() => setRefreshes(n => n + 1), PERF_OVERLAY_REFRESH_MS);
+        return () => clearInterval(timer);
+    }, []);
+
+    const { metrics } = perf;
+    const exportReport = () => {
+        const report = perf.report();
+        downloadBlob(new Blob([JSON.stringify(report, null, 2)], { type: 'application/json' }), `wellbeing-perf-${report.sessionId}.json`);
+    };
+
+    return (
+        <details className="fixed bottom-4 right-4 w-96 max-h-[80vh] overflow-auto p-3 rounded-lg shadow-xl bg-white/95 dark:bg-gray-900/95 text-xs text-gray-700 dark:text-gray-300">
+            <summary className="cursor-pointer font-semibold">Performance</summary>
+            <p className="mt-2">First render {formatMs(metrics.firstRenderMs)}, first snapshot {formatMs(metrics.firstSnapshotMs)}</p>
+            <PerfTable
+                title="Firestore documents"
+                columns={['Collection', 'Reads', 'Writes']}
+                rows={Object.entries(metrics.firestore).map(([name, counts]) => [name, sumOf(counts, READ_OPERATIONS), sumOf(counts, WRITE_OPERATIONS)])}
+            />
+            <PerfTable title="Snapshot passes" columns={['Listener', 'Passes', 'Avg', 'Max']} rows={timingRows(metrics.snapshots)} />
+            <PerfTable title="Renders" columns={['Component', 'Commits', 'Avg', 'Max']} rows={renderRows(metrics)} />
+            {Object.keys(metrics.commits).length > 0 && Object.keys(metrics.renders).length === 0 && (
+                <p className="mt-1 text-gray-500">Render times need a development or profiling build of React.</p>
+            )}
+            <PerfTable
+                title="Operations"
+                columns={['Name', 'Count', 'Avg', 'Max', 'Failed']}
+                rows={timingRows(metrics.spans).map(row => [...row, metrics.spans[row[0]].failures || 0])}
+            />
+            {Object.entries(perf.readStats()).map(([name, stats]) => (
+                <PerfTable key={name} title={name} columns={['Counter', 'Value']} rows={Object.entries(stats)} />
+            ))}
+            <button className="mt-3 py-1 px-3 rounded bg-gray-100 dark:bg-gray-700 hover:bg-gray-200 dark:hover:bg-gray-600" onClick={exportReport}>
+                Export JSON
+            </button>
+        </details>
+    );
+};
+
+// Main App component
+const App = () => {
+    const activeTab = useStore(appStore, s => s.activeTab);
+    const loadingData = useStore(appStore, s => s.loadingData);
+
+    // Firebase initialization and authentication
+    useEffect(() => {
+        const appId = typeof __app_id !== 'undefined' ? __app_id : 'default-app-id';
+        const firebaseConfig = typeof __firebase_config !== 'undefined' ? JSON.parse(__firebase_config) : {};
+        let cancelled = false;
+        let unsubscribe = () => {};
+
+        // Loading auth through to the first signed-in user
+        const endAuthSpan = perf && perf.span('auth');
 
         try {
-            await deleteDoc(doc(firebaseDb, collectionPath, id));
-            console.log(`${type} entry deleted successfully!`);
-        } catch (e) {
-            console.error(`Error deleting ${type} entry: `, e);
-        } finally {
-            setShowConfirmation(false);
-            setEntryToDelete(null);
-            setDeleteType('');
+            const app = initializeApp(firebaseConfig);
+            const db = createFirestore(app);
+
+            // The auth SDK is loaded on demand to keep it out of the initial bundle. Firestore is only
+            // handed to the listeners once auth is registered, so no query starts unauthenticated;
+            // until then a remembered user's cached history is already on screen.
+            // __auth_emulator_url ("http://host:port") targets the Auth emulator.
+            import('firebase/auth').then(({ getAuth, connectAuthEmulator, signInAnonymously, signInWithCustomToken, onAuthStateChanged }) => {
+                if (cancelled) return;
+                const auth = getAuth(app);
+                if (typeof __auth_emulator_url !== 'undefined') {
+                    connectAuthEmulator(auth, __auth_emulator_url, { disableWarnings: true });
+                }
+                appStore.setState({ db, auth });
+
+                unsubscribe = onAuthStateChanged(auth, async (user) => {
+                    if (user) {
+                        if (endAuthSpan) endAuthSpan();
+                        appStore.setState({ userId: user.uid });
+                        writeLocal('lastUserId', user.uid);
+                    } else {
+                        // Sign in anonymously if no user is logged in
+                        try {
+                            if (typeof __initial_auth_token !== 'undefined') {
+                                await signInWithCustomToken(auth, __initial_auth_token);
+                            } else {
+                                await signInAnonymously(auth);
+                            }
+                        } catch (error) {
+                            console.error("Error signing in:", error);
+                            if (endAuthSpan) endAuthSpan(error);
+                        }
+                    }
+                    appStore.setState({ loadingData: false });
+                });
+            }).catch((error) => {
+                console.error("Error loading Firebase Auth:", error);
+                if (endAuthSpan) endAuthSpan(error);
+                appStore.setState({ loadingData: false });
+            });
+
+            return () => {
+                cancelled = true;
+                unsubscribe();
+            };
+        } catch (error) {
+            console.error("Error initializing Firebase:", error);
+            appStore.setState({ loadingData: false });
         }
-    };
+    }, []);
 
-    // Format timestamp for display
-    const formatTimestamp = (timestamp) => {
-        if (!timestamp) return 'N/A';
-        const date = timestamp.toDate ? timestamp.toDate() : new Date(timestamp);
-        return date.toLocaleString();
-    };
+    // Track connectivity so the UI can explain that entries are queued while offline
+    useEffect(() => {
+        const goOnline = () => appStore.setState({ online: true });
+        const goOffline = () => appStore.setState({ online: false });
+        window.addEventListener('online', goOnline);
+        window.addEventListener('offline', goOffline);
+        return () => {
+            window.removeEventListener('online', goOnline);
+            window.removeEventListener('offline', goOffline);
+        };
+    }, []);
 
     if (loadingData) {
         return (
@@ -245,209 +3827,40 @@ const App = () => {
     return (
         <div className="min-h-screen bg-gradient-to-br from-purple-50 to-indigo-100 dark:from-gray-900 dark:to-gray-800 text-gray-800 dark:text-gray-200 font-inter p-4 sm:p-6 lg:p-8">
             <div className="max-w-4xl mx-auto bg-white dark:bg-gray-800 rounded-xl shadow-2xl overflow-hidden">
-                {/* Header */}
-                <div className="p-6 bg-gradient-to-r from-purple-600 to-indigo-700 text-white text-center rounded-t-xl">
-                    <h1 className="text-3xl sm:text-4xl font-bold mb-2">My Well-being Hub</h1>
-                    <p className="text-lg sm:text-xl opacity-90">Track your mood, journal, and chat with AI.</p>
-                    {userId && (
-                        <p className="text-sm mt-2 opacity-80">User ID: {userId}</p>
-                    )}
-                </div>
+                <Profiled id="Header">
+                    <Header />
+                </Profiled>
+                <OfflineBanner />
 
                 {/* Navigation Tabs */}
-                <div className="flex justify-around bg-gray-100 dark:bg-gray-700 p-3 border-b border-gray-200 dark:border-gray-600">
-                    <button
-                        onClick={() => setActiveTab('mood')}
-                        className={`py-2 px-4 rounded-lg font-medium transition-all duration-300 ${activeTab === 'mood' ? 'bg-purple-500 text-white shadow-md' : 'text-gray-700 dark:text-gray-300 hover:bg-gray-200 dark:hover:bg-gray-600'}`}
-                    >
-                        <i className="fas fa-smile mr-2"></i>Mood Tracker
-                    </button>
-                    <button
-                        onClick={() => setActiveTab('journal')}
-                        className={`py-2 px-4 rounded-lg font-medium transition-all duration-300 ${activeTab === 'journal' ? 'bg-purple-500 text-white shadow-md' : 'text-gray-700 dark:text-gray-300 hover:bg-gray-200 dark:hover:bg-gray-600'}`}
-                    >
-                        <i className="fas fa-book-open mr-2"></i>Journal
-                    </button>
-                    <button
-                        onClick={() => setActiveTab('chat')}
-                        className={`py-2 px-4 rounded-lg font-medium transition-all duration-300 ${activeTab === 'chat' ? 'bg-purple-500 text-white shadow-md' : 'text-gray-700 dark:text-gray-300 hover:bg-gray-200 dark:hover:bg-gray-600'}`}
-                    >
-                        <i className="fas fa-robot mr-2"></i>AI Chatbot
-                    </button>
-                </div>
+                <Profiled id="TabBar">
+                    <TabBar />
+                </Profiled>
 
                 {/* Content Area */}
                 <div className="p-6">
-                    {activeTab === 'mood' && (
-                        <div className="space-y-6">
-                            <h2 className="text-2xl font-semibold text-gray-900 dark:text-gray-100 mb-4">How are you feeling today?</h2>
-                            <div className="flex flex-wrap gap-3 mb-4">
-                                {['Happy', 'Neutral', 'Sad', 'Anxious', 'Energetic', 'Tired', 'Calm', 'Stressed'].map(m => (
-                                    <button
-                                        key={m}
-                                        onClick={() => setMood(m)}
-                                        className={`py-2 px-4 rounded-full text-sm font-medium transition-all duration-200
-                                            ${mood === m ? 'bg-purple-500 text-white shadow-lg scale-105' : 'bg-gray-200 dark:bg-gray-700 text-gray-700 dark:text-gray-300 hover:bg-purple-100 dark:hover:bg-purple-900'}`}
-                                    >
-                                        {m}
-                                    </button>
-                                ))}
-                            </div>
-                            <button
-                                onClick={handleMoodSubmit}
-                                disabled={!mood}
-                                className="w-full bg-indigo-600 hover:bg-indigo-700 text-white font-bold py-3 px-6 rounded-lg shadow-md transition-all duration-300 disabled:opacity-50 disabled:cursor-not-allowed"
-                            >
-                                Log Mood
-                            </button>
-
-                            <div className="mt-8">
-                                <h3 className="text-xl font-semibold text-gray-900 dark:text-gray-100 mb-3">Your Mood History</h3>
-                                {moodEntries.length === 0 ? (
-                                    <p className="text-gray-600 dark:text-gray-400">No mood entries yet. Log your first mood!</p>
-                                ) : (
-                                    <ul className="space-y-3">
-                                        {moodEntries.map(entry => (
-                                            <li key={entry.id} className="flex justify-between items-center bg-gray-50 dark:bg-gray-700 p-4 rounded-lg shadow-sm">
-                                                <span className="font-medium text-gray-800 dark:text-gray-200">{entry.mood}</span>
-                                                <span className="text-sm text-gray-500 dark:text-gray-400">{formatTimestamp(entry.timestamp)}</span>
-                                                <button
-                                                    onClick={() => confirmDelete(entry.id, 'mood')}
-                                                    className="text-red-500 hover:text-red-700 text-lg transition-colors duration-200"
-                                                    title="Delete mood entry"
-                                                >
-                                                    <i className="fas fa-trash"></i>
-                                                </button>
-                                            </li>
-                                        ))}
-                                    </ul>
-                                )}
-                            </div>
-                        </div>
-                    )}
-
-                    {activeTab === 'journal' && (
-                        <div className="space-y-6">
-                            <h2 className="text-2xl font-semibold text-gray-900 dark:text-gray-100 mb-4">Write your thoughts</h2>
-                            <textarea
-                                className="w-full p-4 border border-gray-300 dark:border-gray-600 rounded-lg focus:ring-indigo-500 focus:border-indigo-500 bg-white dark:bg-gray-700 text-gray-900 dark:text-gray-100 placeholder-gray-400 dark:placeholder-gray-500 min-h-[150px]"
-                                placeholder="What's on your mind today?"
-                                value={journalEntry}
-                                onChange={(e) => setJournalEntry(e.target.value)}
-                            ></textarea>
-                            <button
-                                onClick={handleJournalSubmit}
-                                disabled={!journalEntry.trim()}
-                                className="w-full bg-indigo-600 hover:bg-indigo-700 text-white font-bold py-3 px-6 rounded-lg shadow-md transition-all duration-300 disabled:opacity-50 disabled:cursor-not-allowed"
-                            >
-                                Save Journal Entry
-                            </button>
-
-                            <div className="mt-8">
-                                <h3 className="text-xl font-semibold text-gray-900 dark:text-gray-100 mb-3">Your Journal Entries</h3>
-                                {journalEntries.length === 0 ? (
-                                    <p className="text-gray-600 dark:text-gray-400">No journal entries yet. Start writing!</p>
-                                ) : (
-                                    <ul className="space-y-3">
-                                        {journalEntries.map(entry => (
-                                            <li key={entry.id} className="bg-gray-50 dark:bg-gray-700 p-4 rounded-lg shadow-sm">
-                                                <p className="text-gray-800 dark:text-gray-200 mb-2">{entry.content}</p>
-                                                <div className="flex justify-between items-center text-sm text-gray-500 dark:text-gray-400">
-                                                    <span>{formatTimestamp(entry.timestamp)}</span>
-                                                    <button
-                                                        onClick={() => confirmDelete(entry.id, 'journal')}
-                                                        className="text-red-500 hover:text-red-700 text-lg transition-colors duration-200"
-                                                        title="Delete journal entry"
-                                                    >
-                                                        <i className="fas fa-trash"></i>
-                                                    </button>
-                                                </div>
-                                            </li>
-                                        ))}
-                                    </ul>
-                                )}
-                            </div>
-                        </div>
-                    )}
-
-                    {activeTab === 'chat' && (
-                        <div className="flex flex-col h-[500px] bg-gray-50 dark:bg-gray-700 rounded-lg shadow-md">
-                            <div ref={chatContainerRef} className="flex-1 p-4 overflow-y-auto space-y-4">
-                                {chatHistory.length === 0 ? (
-                                    <div className="text-center text-gray-500 dark:text-gray-400 mt-10">
-                                        Start a conversation with your AI companion!
-                                    </div>
-                                ) : (
-                                    chatHistory.map((msg, index) => (
-                                        <div key={index} className={`flex ${msg.role === 'user' ? 'justify-end' : 'justify-start'}`}>
-                                            <div className={`max-w-[70%] p-3 rounded-lg shadow-sm ${msg.role === 'user' ? 'bg-indigo-500 text-white rounded-br-none' : 'bg-gray-200 dark:bg-gray-600 text-gray-900 dark:text-gray-100 rounded-bl-none'}`}>
-                                                <p className="text-sm">{msg.text}</p>
-                                                <span className="block text-xs opacity-75 mt-1">{formatTimestamp(msg.timestamp)}</span>
-                                            </div>
-                                        </div>
-                                    ))
-                                )}
-                                {loadingChat && (
-                                    <div className="flex justify-start">
-                                        <div className="max-w-[70%] p-3 rounded-lg shadow-sm bg-gray-200 dark:bg-gray-600 text-gray-900 dark:text-gray-100 rounded-bl-none">
-                                            <div className="flex items-center">
-                                                <div className="animate-spin rounded-full h-4 w-4 border-b-2 border-gray-900 dark:border-gray-100 mr-2"></div>
-                                                <span>Thinking...</span>
-                                            </div>
-                                        </div>
-                                    </div>
-                                )}
-                            </div>
-                            <form onSubmit={handleChatSubmit} className="p-4 border-t border-gray-200 dark:border-gray-600 flex items-center">
-                                <input
-                                    type="text"
-                                    className="flex-1 p-3 border border-gray-300 dark:border-gray-600 rounded-l-lg focus:ring-indigo-500 focus:border-indigo-500 bg-white dark:bg-gray-800 text-gray-900 dark:text-gray-100 placeholder-gray-400 dark:placeholder-gray-500"
-                                    placeholder="Type your message..."
-                                    value={chatInput}
-                                    onChange={(e) => setChatInput(e.target.value)}
-                                    disabled={loadingChat}
-                                />
-                                <button
-                                    type="submit"
-                                    className="bg-indigo-600 hover:bg-indigo-700 text-white font-bold py-3 px-5 rounded-r-lg shadow-md transition-all duration-300 disabled:opacity-50 disabled:cursor-not-allowed"
-                                    disabled={!chatInput.trim() || loadingChat}
-                                >
-                                    <i className="fas fa-paper-plane"></i>
-                                </button>
-                            </form>
-                        </div>
-                    )}
+                    {/* Each tab retains only the listeners it needs while mounted */}
+                    <Profiled id={`tab:${activeTab}`}>
+                        {activeTab === 'mood' && <MoodTab />}
+                        {activeTab === 'journal' && <JournalTab />}
+                        {activeTab === 'chat' && <ChatTab />}
+                    </Profiled>
                 </div>
+
+                <Profiled id="DataPanel">
+                    <DataPanel />
+                </Profiled>
             </div>
 
-            {/* Confirmation Modal */}
-            {showConfirmation && (
-                <div className="fixed inset-0 bg-black bg-opacity-50 flex items-center justify-center p-4 z-50">
-                    <div className="bg-white dark:bg-gray-800 rounded-lg p-6 shadow-xl max-w-sm w-full text-center">
-                        <h3 className="text-xl font-semibold text-gray-900 dark:text-gray-100 mb-4">Confirm Deletion</h3>
-                        <p className="text-gray-700 dark:text-gray-300 mb-6">Are you sure you want to delete this {deleteType} entry? This action cannot be undone.</p>
-                        <div className="flex justify-center gap-4">
-                            <button
-                                onClick={() => setShowConfirmation(false)}
-                                className="px-6 py-2 rounded-lg border border-gray-300 dark:border-gray-600 text-gray-700 dark:text-gray-300 hover:bg-gray-100 dark:hover:bg-gray-700 transition-colors duration-200"
-                            >
-                                Cancel
-                            </button>
-                            <button
-                                onClick={handleDelete}
-                                className="px-6 py-2 rounded-lg bg-red-600 text-white hover:bg-red-700 transition-colors duration-200"
-                            >
-                                Delete
-                            </button>
-                        </div>
-                    </div>
-                </div>
-            )}
+            {PERF_OVERLAY && <PerfOverlay />}
 
-            {/* Font Awesome for icons */}
-            <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/5.15.3/css/all.min.css"></link>
-            {/* Google Fonts - Inter */}
-            <link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap" rel="stylesheet"></link>
+            {/* Google Fonts - Inter, loaded without blocking render (applied once the stylesheet arrives) */}
+            <link
+                href="https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap"
+                rel="stylesheet"
+                media="print"
+                onLoad={(e) => { e.currentTarget.media = 'all'; }}
+            ></link>
         </div>
     );
 };